@@ -22,15 +22,48 @@
 
 #-----Import needed modules and define global constants------#
 
-#Import numpy and sounddevice for calulating the sine waves and playing them (respectively).
-import numpy, sounddevice
+#Import numpy and sounddevice for calulating the sine waves and playing them (respectively). Without sounddevice, the sine waves can still be created, stored and
+#verified, and the stations can be played into the NullOutputStream - only playing them on a sound card needs it.
+import numpy
 
-#Import the OcempGUI gui modules
-from ocempgui.widgets import *                          #For the GUI widgets
-from ocempgui.widgets.Constants import *                #For GUI constants
+try:
+    import sounddevice
+except ImportError:
+    sounddevice = None
+
+#Import the standard modules used for running several stations at once (a lock for each station and a timer for measuring the real-time headroom)
+import threading, timeit
+
+#Import the standard modules used by the control server (for reading commands and the command line options)
+import argparse, collections, json
+
+#Import the standard module used for putting the date on verification reports
+import time
+
+#Import the standard modules used by the render store (for naming the stored sine waves by their hash and managing the files)
+import hashlib, os
+
+#Import the standard module used for reading the transmit frequency bands from a config file (it was renamed in Python 3)
+try:
+    import configparser
+except ImportError:
+    import ConfigParser as configparser
+
+#Import the OcempGUI gui modules (only needed for the GUI, not for the control server)
+try:
+    from ocempgui.widgets import *                      #For the GUI widgets
+    from ocempgui.widgets.Constants import *            #For GUI constants
+    HAS_GUI = True
+except ImportError:
+    HAS_GUI = False
 
 GUI_COLOR = (234, 228, 223) #The background color of the GUI
 
+SPEED_OF_LIGHT = 299792458  #The speed of light in meters per second (used in the Doppler Equation)
+
+ENGINE_VERSION = "1.0"      #The version of the sine wave calculations. This MUST be changed whenever 'create_sine_data()' changes, so that sine waves stored
+                            #by an older version are not reused by the RenderStore.
+
 
 #----------Start of Class Definitions----------#
 
@@ -277,6 +310,121 @@ be switched to. """
         return self.main_table
 
 
+#----------------------------------------------------------------------------------------------------------------------------------------------------------------#
+# This class is used to keep track of the transmit frequency bands that radar guns can use. It starts with the three standard carriers (K, Ka, and X band), but  #
+# any carrier frequency can be added - either from a program or from a config file - since radar guns in the same band can transmit on different carriers        #
+# (Ka-band guns, for example, are spread out from about 33.4 to 36.0 GHz).                                                                                       #
+#----------------------------------------------------------------------------------------------------------------------------------------------------------------#
+
+class BandRegistry(object):
+    """ A registry of named transmit frequencies (in Hz), which can calculate the Doppler frequencies for many carriers and speeds at once. """
+
+    #These are the standard bands (and their transmit frequencies in Hz) that every registry starts with
+    DEFAULT_BANDS = (('K', 24.150e9), ('Ka', 34.7e9), ('X', 10.525e9))
+
+    SECTION = 'bands' #The section of a config file that holds the bands
+
+    def __init__(self):
+        self.bands = collections.OrderedDict(BandRegistry.DEFAULT_BANDS) #The transmit frequencies, stored by the names of their bands (in the order added)
+
+
+    #---------------------------------------------------------------------#
+    # Here are the methods for adding, removing and looking up the bands  #
+    #---------------------------------------------------------------------#
+
+    def add_band(self, name, trans_freq):
+        """ This method adds a band called 'name' with the transmit frequency 'trans_freq' (in Hz), replacing the frequency if the band is already in the
+registry. If the frequency is not a positive number, 'TRANSMIT FREQ ERROR' is returned; otherwise None is returned. """
+        error = check_trans_freq(trans_freq)
+
+        if error != None:
+            return error
+
+        self.bands[name] = float(trans_freq)
+        return None
+
+    def remove_band(self, name):
+        """ This method removes the band called 'name'. If there is no such band, 'BAND ERROR' is returned; otherwise None is returned. """
+        if name not in self.bands:
+            return 'BAND ERROR'
+
+        del self.bands[name]
+        return None
+
+    def get_frequency(self, name):
+        """ This method returns the transmit frequency (in Hz) of the band called 'name', or None if there is no such band. """
+        return self.bands.get(name)
+
+    def get_names(self):
+        """ This method returns a list of the names of all the bands (in the order they were added). """
+        return list(self.bands.keys())
+
+    def get_frequencies(self, names = None):
+        """ This method returns a numpy array with the transmit frequencies of the bands in 'names' (or of all the bands if 'names' is None). If any of the
+names is not in the registry, 'BAND ERROR' is returned instead. A single name can be passed on its own (instead of in a list). """
+        if names is None: #Not '==', which would compare every name if 'names' is a numpy array
+            names = self.get_names()
+        elif isinstance(names, (str, type(u''))):
+            names = [names]
+
+        for name in names:
+            if name not in self.bands:
+                return 'BAND ERROR'
+
+        return numpy.array([self.bands[name] for name in names])
+
+
+    #---------------------------------------------------------------------------------------------------------------------------------------------#
+    # This method loads bands from a config file, where each line in the [bands] section gives the name of a band and its transmit frequency:     #
+    #                                                                                                                                             #
+    #     [bands]                                                                                                                                 #
+    #     Ka-33.8 = 33.8e9                                                                                                                        #
+    #     Ka-35.5 = 35.5e9                                                                                                                        #
+    #---------------------------------------------------------------------------------------------------------------------------------------------#
+
+    def load(self, path):
+        """ This method adds the bands in the config file at 'path' to the registry. If the file cannot be read or any of its bands is invalid, 'CONFIG ERROR'
+is returned and none of the bands are added; otherwise None is returned. """
+        parser = configparser.RawConfigParser()
+        parser.optionxform = str #Keep the case of the band names (config files are lower case by default)
+
+        try:
+            if parser.read(path) == [] or not parser.has_section(BandRegistry.SECTION): #If the file could not be opened or has no bands
+                return 'CONFIG ERROR'
+
+            items = parser.items(BandRegistry.SECTION)
+
+        except configparser.Error:
+            return 'CONFIG ERROR'
+
+        #Check all of the bands before adding any, so that a bad file does not leave the registry half changed
+        bands = []
+
+        for name, value in items:
+            if check_trans_freq(value) != None:
+                return 'CONFIG ERROR'
+
+            bands.append((name, float(value)))
+
+        for name, trans_freq in bands:
+            self.bands[name] = trans_freq
+
+        return None
+
+
+    def doppler_grid(self, speeds, names = None, is_metric = False):
+        """ This method returns the Doppler frequencies (in Hz) for every band in 'names' (or every band in the registry) and every speed in 'speeds', as a
+numpy array with one row for each band and one column for each speed (see 'doppler_grid()'). If any of the names is not in the registry, 'BAND ERROR' is
+returned instead. """
+        trans_freqs = self.get_frequencies(names)
+
+        if type(trans_freqs) == str:
+            return trans_freqs
+
+        return doppler_grid(trans_freqs, speeds, is_metric)
+
+
+
 #------------------------------------------------------------------------------------------------------------------------------------------------------------------#
 # This class is used to set up and create the graphical user interface. It takes the simple and advanced windows as objects and uses their main tables for getting #
 # input from the user. The tables can be switched out - and the number of vehicles for the advanced table specified - using widgets (such as radio buttons).       #
@@ -292,6 +440,8 @@ switching between the simple and advanced windows."""
     FREQUENCY_SAMPLE = 44.1e3       #This is the (default) frequency sample for creating sine waves
     MAPPING = numpy.array([1, 2])   #This is the (default) mapping used to specify the channels used for each sine wave when creating them using sounddevice
 
+    BANDS = BandRegistry() #The transmit frequency bands that can be chosen using the band radio buttons
+
     def __init__(self, simple_obj = SimpleWindow(), advanced_obj = AdvancedWindow()):
 
         self.gui = None             #The 'renderer' for the interface. It is basically the gui - holds the window screen, all the widgets, and manages all the events.
@@ -325,10 +475,17 @@ switching between the simple and advanced windows."""
 
         self.kband_rad.active = True #Set the K-Band frequency to active by default, since it is the most used/common frequency
 
+        #Keep the radio buttons along with the name of their band in the band registry. Any other bands in the registry (such as ones loaded from a config
+        #file) get a radio button of their own, with the name of the band as its text.
+        self.band_rads = collections.OrderedDict([('K', self.kband_rad), ('Ka', self.kaband_rad), ('X', self.xband_rad)])
+
+        for name in MainWindow.BANDS.get_names():
+            if name not in self.band_rads:
+                self.band_rads[name] = RadioButton(name, self.kband_rad)
+
         #Add the radio buttons to the band frame
-        self.band_frame.add_child(self.kband_rad)
-        self.band_frame.add_child(self.kaband_rad)
-        self.band_frame.add_child(self.xband_rad)
+        for band_rad in self.band_rads.values():
+            self.band_frame.add_child(band_rad)
 
         #Create and set up the run button for starting the simulation
         self.run_button = Button("#Run")
@@ -397,6 +554,20 @@ label to the current units the user wants to use. """
 
 
 
+    #-----------------------------------------------------------------------------------------------------------#
+    # This method returns the transmit frequency (in Hz) of the band chosen by the user with the radio buttons. #
+    #-----------------------------------------------------------------------------------------------------------#
+
+    def get_transmit_frequency(self):
+        """ This method returns the transmit frequency (in Hz) of the band selected by the user, looked up in the band registry. If no band radio button is
+active (or its band is no longer in the registry), None is returned. """
+        for name, band_rad in self.band_rads.items():
+            if band_rad.active:
+                return MainWindow.BANDS.get_frequency(name)
+
+        return None #Otherwise, return None to indicate an error occurred (since no transmit frequency was chosen)
+
+
     #----------------------------------------------------------------------------------------------------------------------------------------------------------#
     # This method calculates the frequency of a sine wave based upon the passed velocity (in meters per second) and the transmit frequency chosen by the user. #
     #----------------------------------------------------------------------------------------------------------------------------------------------------------#
@@ -407,23 +578,13 @@ The frequency is calculated using the Doppler Equation:
 
     frequency = (2 * transmit_frequency * velocity) / c
     """
-        c = 299792458 #The speed of light in meters per second
-
-        #Dermine the transmit frequency using the band radio buttons
-        if self.kband_rad.active:
-            trans_freq = 24.150e9 #For K-band (in Hz)
-            
-        elif self.kaband_rad.active:
-            trans_freq = 34.7e9   #For Ka-Band (in Hz)
-            
-        elif self.xband_rad.active:
-            trans_freq = 10.525e9 #For X-Band (in Hz)
+        trans_freq = self.get_transmit_frequency() #Dermine the transmit frequency using the band radio buttons
 
-        else: #Otherwise, return None to indicate an error occurred (since no transmit frequency was chosen)
+        if trans_freq == None: #If no transmit frequency was chosen, return None to indicate an error occurred
             return None
             
         #Calculate and return the frequency using the Doppler Equation
-        return (2 * trans_freq * velocity) / c
+        return doppler_frequency(velocity, trans_freq)
 
 
     #----------------------------------#
@@ -550,63 +711,8 @@ the radar gun.
 NOTE: The sine wave, after creation, is scaled by the amplitude, but no checks are made to see if the waves are out of bounds and need to be scaled down. This is
 taken care of in the 'run()' method (where the sine waves are always scaled down by the maximum value in the numpy array to keep the uppermost value as 1). """
         
-        #First determine the phase angle using the direction
-        if direction:                       #If the direction is towards the radar
-            phase_angle = numpy.pi/2
-        elif direction == False:            #If the direction is away from the radar
-            phase_angle = -1 * numpy.pi/2
-        else:                               #Otherwise, the user did not choose a direction, so return 'ERROR' since the sine wave cannot be created
-            return 'DIR ERROR'
-
-        #Convert the passed string data into floating point numbers, if possible
-        try:
-            speed_units = float(speed_units)
-            duration = float(duration)
-            amplitude = float(amplitude)
-            
-        except ValueError:
-            return 'CONVERT ERROR' #Return an error message that the speed and/or the duration could not be converted (
-
-        frequency_sample = MainWindow.FREQUENCY_SAMPLE #Set the frequency sample to the standard sample stored in FREQUENCY_SAMPLE of the 
-
-        #Turn the speed value in the specified units (either mph or kph) into meters per second and then calculate the frequency using the Doppler Equation
-
-        if self.metric_button.active: #If the metric button is active (checked), then the units are in kilometers per hour
-            #print "--in run, using metric units..." #DEBUG
-            meters_per_sec = speed_units * (1000.0 / 60**2) #Convert to meters per second (make 1000 a floating point number to avoid integer division)
-
-        else: #Otherwise, the units are in miles per hour
-            #print "--in run, using English units..." #DEBUG
-            meters_per_sec = speed_units * (1609.34 / 60**2) #Convert to meters per second
-        
-        frequency = self.calc_frequency(meters_per_sec) #Calculate and get the frequency (in Hz)
-
-        #print frequency #DEBUG
-
-        #If the frequency is None, then an error occurred (transmit frequency not specified) and exit the function with an error string
-        if frequency == None:
-            return 'TRANSMIT FREQ ERROR' #No transmit frequency was specified
-
-        #Create a numpy array that contains the numbers from 1 to the frequency sample multiplied by the duration. This is used to both create the sine wave and to
-        #determine its length of time to play
-        n_list = numpy.arange(1, int(round(duration * frequency_sample) + 1))
-
-        #Now, calculate the arrays/lists of cosine function values for creating the sound wave
-        ch_1_data = numpy.cos(2 * numpy.pi * frequency * n_list / frequency_sample)                         #The data for the first (left) channel of the sound
-        ch_2_data = 1.9 * numpy.cos((2 * numpy.pi * frequency * n_list / frequency_sample) - phase_angle)   #The data for the second (right) channel of the sound
-        
-        #Combine the two numpy arrays into one - needed for sending into sounddevice : will play multiple channels, but have to be in one multi-dimensional array
-        channels = numpy.array([ch_1_data, ch_2_data])
-
-        #Getting the transpose because sounddevice interprets COLUMNS as channels, NOT ROWS - using numpy.array([ch_1_data, ch_2_data]) returns
-        #the channel 1 and 2 arrays as ROWS of the new array. Thusly, to fit the specifications of sounddevice, the transpose must be used.
-        channels = channels.T
-
-        #Finally, multiply both channels by the passed amplitude.
-        channels = channels * amplitude
-
-        #Return the channels for the sine wave from the method
-        return channels
+        #The sine wave itself is created by the 'create_sine_data()' function, using the transmit frequency and units chosen by the user in the GUI
+        return create_sine_data(speed_units, direction, duration, amplitude, self.get_transmit_frequency(), self.metric_button.active)
             
             
 
@@ -645,109 +751,1690 @@ taken care of in the 'run()' method (where the sine waves are always scaled down
 
 
 
-#----------End of Class Definitions----------#
+#----------------------------------------------------------------------------------------------------------------------------------------------------------#
+# This class is used to keep the sine waves that were created in files on disk, so that they can be reused (across sessions and stations) instead of being #
+# created again, and so that it can be proven later which exact sine wave a radar gun was tested with. Each sine wave is stored under the hash of all the  #
+# data used to create it (the inputs of 'create_sine()', the frequency sample, the data type and ENGINE_VERSION), so identical requests share one file.    #
+#                                                                                                                                                          #
+# Stored sine waves are opened with numpy's memory mapping, so they are read from the disk as they are played instead of all at once. The store is kept    #
+# under a size limit by removing the sine waves that have gone the longest without being used.                                                             #
+#----------------------------------------------------------------------------------------------------------------------------------------------------------#
 
+class RenderStore(object):
+    """ A persistent, size-limited store of created sine waves, named by the hash of the data they were created from. It also keeps a log of test records. """
 
+    MAX_BYTES = 2**30                   #The default size limit of the store (1 GB)
+    RECORD_FILE = 'records.jsonl'       #The name of the file (within the store) that the test records are logged in - one JSON object on each line
 
+    def __init__(self, path, max_bytes = MAX_BYTES, dtype = 'float64'):
+        """ The store keeps its files in the directory 'path' (which is created if needed) and removes old sine waves once the files take up more than
+'max_bytes'. Every file in the store counts toward the limit, including the test records - but the test records are never removed, so only the sine waves
+(and the data saved alongside them) make room. The sine waves are stored using the numpy data type 'dtype'. """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.dtype = numpy.dtype(dtype)
 
+        self.lock = threading.Lock() #Used to keep two threads from changing the files at once
 
+        if not os.path.isdir(path):
+            os.makedirs(path)
 
-#----------Start of Function Definitions----------#
 
+    #-----------------------------------------------------------------------------------------------------------------------#
+    # This method creates the key (hash) for a sine wave. The data is checked the same way, and in the same order, as in    #
+    # 'create_sine_data()', so that a request that cannot be created gets the same error string without creating a key.     #
+    #-----------------------------------------------------------------------------------------------------------------------#
 
-#--------------------------------------------------------------------------------------------------------------------#
-# This function is used to create a dialog window to display messages about errors that occur during the simulation. #
-#--------------------------------------------------------------------------------------------------------------------#
+    def get_key(self, speed_units, direction, duration, amplitude, trans_freq, is_metric = False, frequency_sample = MainWindow.FREQUENCY_SAMPLE):
+        """ This method returns the key (a SHA-256 hash, as a string of hex digits) for the sine wave that 'create_sine_data()' would create from the passed data,
+or an error string if it cannot be created. """
+        if not direction and direction != False: #Neither approaching (any true value) nor receding
+            return 'DIR ERROR'
 
-def create_error_window(gui, error_string):
-    """ This method creates a dialog window to display an error message to the user when an error occurs when running the simulation. """
+        try:
+            speed_units = float(speed_units)
+            duration = float(duration)
+            amplitude = float(amplitude)
+        except (TypeError, ValueError):
+            return 'CONVERT ERROR'
 
-    #Create the buttons and the results for the buttons for the dialog window
-    buttons = [Button("#Close")]
-    signals = [DLGRESULT_OK]
+        if check_trans_freq(trans_freq) != None:
+            return 'TRANSMIT FREQ ERROR'
 
-    #Create the dialog window
-    dialog_win = GenericDialog("Error Message", buttons, signals)
+        return hashlib.sha256(json.dumps(self.get_params(speed_units, direction, duration, amplitude, trans_freq, is_metric, frequency_sample),
+                                         sort_keys = True).encode('utf-8')).hexdigest()
 
-    error = error_string + ": " #The type of error that was created
+    def get_params(self, speed_units, direction, duration, amplitude, trans_freq, is_metric = False, frequency_sample = MainWindow.FREQUENCY_SAMPLE):
+        """ This method returns the dictionary of all the data that the key of a sine wave is created from (this is also saved alongside each stored sine
+wave). The numbers must already be floats. """
+        return {'speed': speed_units, 'direction': bool(direction), 'duration': duration, 'amplitude': amplitude, 'trans_freq': float(trans_freq),
+                'is_metric': bool(is_metric), 'frequency_sample': float(frequency_sample), 'dtype': self.dtype.str, 'engine': ENGINE_VERSION}
 
-    #Set up the widgets needed for the message
-    e_label = Label(error)      #Create a Label widget to display the kind of error that occured
-    frame = VFrame()            #Create a VFrame to hold the Label widget
 
-    frame.add_child(e_label) #Add the error string label to the frame
-    
-    #Determine what error string was passed into the function and get the appropriate error message to display
-    if error_string == "DIR ERROR": #An error happened with the direction of the vehicle - no direction specified
+    #---------------------------------------------------------------------------------------------------------#
+    # This is the main method of the store: it returns a stored sine wave, creating and storing it if needed. #
+    #---------------------------------------------------------------------------------------------------------#
 
-        #Create a Label object to display the error message
-        msg_label = Label("Direction for vehicle not specified")
+    def get_sine(self, speed_units, direction, duration, amplitude, trans_freq, is_metric = False, frequency_sample = MainWindow.FREQUENCY_SAMPLE):
+        """ This method returns a tuple of the key and the sine wave data (a read-only, memory mapped numpy array) for the passed data - the same data that is
+passed into 'create_sine_data()'. If the sine wave is already stored it is reused; otherwise it is created and stored. If the sine wave cannot be created, the
+error string is returned instead. """
+        key = self.get_key(speed_units, direction, duration, amplitude, trans_freq, is_metric, frequency_sample)
 
-        #Add the error message to the frame
-        frame.add_child(msg_label)
+        if key.endswith('ERROR'): #A hash is only hex digits, so this can only be an error string
+            return key
 
-    elif error_string == "CONVERT ERROR": #An error happened with the conversion of the speed, duration, and/or amplitude - no data or invalid data specified
+        channels = self._open(key)
 
-        #Create Label objects to display the error message
-        msg_label = Label("Invalid data for speed, duration,")
-        msg_label2 = Label("and/or amplitude")
+        if channels is None: #If the sine wave is not stored yet, create it and store it
+            channels = create_sine_data(speed_units, direction, duration, amplitude, trans_freq, is_metric, frequency_sample)
 
-        #Add the error message to the frame
-        frame.add_child(msg_label)
-        frame.add_child(msg_label2)
+            if type(channels) == str:
+                return channels
 
-    elif error_string == "TRANSMIT FREQ ERROR": #An error happened with the transmit frequency for the vehicle - none was specified
+            params = self.get_params(float(speed_units), direction, float(duration), float(amplitude), trans_freq, is_metric, frequency_sample)
+            channels = channels.astype(self.dtype)
+            self._save(key, channels, params)
 
-        #Create a Label object to display the error message
-        msg_label = Label("No transmit frequency was specified")
+            stored = self._open(key)
 
-        #Add the error message to the frame
-        frame.add_child(msg_label)
+            if stored is None: #The file was removed again right after it was saved (by another process), so use the data that was just created
+                channels.flags.writeable = False #Read-only, the same as a stored sine wave
+            else:
+                channels = stored
 
-    elif error_string == "DATA ERROR": #No data was specified at all (for advanced window)
+        return (key, channels)
 
-        #Create Label objects to display the error message
-        msg_label = Label("Invalid and/or no data was specifed")
-        msg_label2 = Label("for the vehicles")
+    def get_stored_params(self, key):
+        """ This method returns the dictionary of data that the sine wave stored under 'key' was created from, or None if there is no such sine wave. This can
+be used to find out exactly which sine wave a test record refers to. """
+        try:
+            params_file = open(self._file_path(key, '.json'))
+        except (IOError, OSError):
+            return None
 
-        #Add the error message to the frame
-        frame.add_child(msg_label)
-        frame.add_child(msg_label2)
+        try:
+            return json.load(params_file)
+        finally:
+            params_file.close()
 
-    else: #This shouldn't be come to, since any error will be one of the above, but for the impossible case, just say an error occured
 
-        #Create a Label object to display the error message
-        msg_label = Label("An error occured")
+    #----------------------------------------------------------------------------#
+    # Here are the methods for logging and reading the test records in the store #
+    #----------------------------------------------------------------------------#
 
-        #Add the error message to the frame
-        frame.add_child(msg_label)
-        
+    def log_record(self, record):
+        """ This method adds the passed test record (a dictionary, which should include the keys of the sine waves used) to the store's log, along with the
+time it was logged. """
+        record = dict(record)
+        record['time'] = time.strftime("%Y-%m-%d %H:%M:%S")
 
-    dialog_win.content.add_child(frame) # Add the frame to the dialog window's content
-    
-    dialog_win.connect_signal(SIG_DIALOGRESPONSE, close_dialog, dialog_win)
-    dialog_win.depth = 2 #Put the dialog window on top of the other widgets
+        with self.lock:
+            record_file = open(os.path.join(self.path, RenderStore.RECORD_FILE), 'a')
 
-    gui.add_widget(dialog_win) #Add the dialog window to the GUI
+            try:
+                record_file.write(json.dumps(record, sort_keys = True) + '\n')
+            finally:
+                record_file.close()
 
+    def get_records(self):
+        """ This method returns a list of all the test records logged in the store (oldest first). """
+        try:
+            record_file = open(os.path.join(self.path, RenderStore.RECORD_FILE))
+        except (IOError, OSError):
+            return []
 
-#-----------------------------------------------------------------------------------------------------------------#
-# This function simply destroys the passed GenericDialog window (or technically any dialog window passed into it) #
-#-----------------------------------------------------------------------------------------------------------------#
+        try:
+            return [json.loads(line) for line in record_file if line.strip()]
+        finally:
+            record_file.close()
 
-def close_dialog(result, dialog):
-    """ This method destroys the passed dialog window when called. """
-    if result == DLGRESULT_OK: #If the OK result was signaled (which should be the only signal), destroy the dialog window
-        dialog.destroy() #Destroy the dialog window
 
+    #-------------------------------------------------------------------------------------#
+    # Here are the methods that read, write and remove the files of the stored sine waves #
+    #-------------------------------------------------------------------------------------#
 
-#----------End of Function Definitions----------#
+    def _file_path(self, key, extension = '.npy'):
+        """ This method returns the path of the file for the sine wave stored under 'key'. """
+        return os.path.join(self.path, key + extension)
+
+    def _open(self, key):
+        """ This method opens the sine wave stored under 'key' as a memory mapped array and marks it as just used (so that it is removed last). None is returned
+if the sine wave is not stored. """
+        path = self._file_path(key)
+
+        try:
+            channels = numpy.load(path, mmap_mode = 'r')
+            os.utime(path, None) #Update the file's times, which are used to find the sine waves that have gone the longest without being used
+        except (IOError, OSError, ValueError): #The file does not exist (or was removed, or is not a complete numpy file)
+            return None
+
+        return channels
 
+    def _save(self, key, channels, params):
+        """ This method saves the sine wave data under 'key' (along with the data it was created from) and then removes old sine waves if the store is over its
+size limit. The data is written into a temporary file first and then renamed, so that no one can open a half-written sine wave. """
+        temp_path = self._file_path(key, '.%d.%d.tmp' % (os.getpid(), threading.current_thread().ident))
 
+        temp_file = open(temp_path, 'wb')
+        try:
+            numpy.save(temp_file, channels)
+        finally:
+            temp_file.close()
+
+        params_file = open(self._file_path(key, '.json'), 'w')
+        try:
+            json.dump(params, params_file, sort_keys = True)
+        finally:
+            params_file.close()
 
+        with self.lock:
+            try:
+                os.rename(temp_path, self._file_path(key))
+            except OSError: #Another process (or thread) stored the same sine wave first (on Windows, renaming onto an existing file fails)
+                os.remove(temp_path)
 
-#If run by itself without being imported, simply create the GUI window and start it
-if __name__ == "__main__":
-    main = MainWindow()
-    main.start("NIST DTR Radar Target Simulator", 290, 325)
+            self._evict(key)
+
+    def _evict(self, keep):
+        """ This method removes the sine waves that have gone the longest without being used until the store is within its size limit. The size of every file
+in the store counts, but only the sine waves (along with the data saved next to them) are removed. The sine wave stored under 'keep' (the one that was just
+stored) is never removed. """
+        sizes = {}  #The size of every file in the store, stored by the file's name
+        used = {}   #When each stored sine wave was last used, stored by its key
+
+        for name in os.listdir(self.path):
+            try:
+                info = os.stat(os.path.join(self.path, name))
+            except OSError:
+                continue
+
+            sizes[name] = info.st_size
+
+            if name.endswith('.npy'):
+                used[name[:-len('.npy')]] = info.st_mtime
+
+        total = sum(sizes.values())
+
+        for last_used, key in sorted((last_used, key) for key, last_used in used.items()): #The sine waves that were used longest ago come first
+            if total <= self.max_bytes:
+                break
+
+            if key == keep:
+                continue
+
+            try:
+                os.remove(self._file_path(key))
+            except OSError: #The file may still be open (on Windows, files that are memory mapped cannot be removed)
+                continue
+
+            total -= sizes[key + '.npy']
+
+            try:
+                os.remove(self._file_path(key, '.json'))
+                total -= sizes.get(key + '.json', 0)
+            except OSError:
+                pass
+
+
+
+#-----------------------------------------------------------------------------------------------------------------------------------------------------------------#
+# This class is used to represent a single test bench (station) when several radar guns are tested from one computer with a multichannel sound card. Each         #
+# station has its own pair of output channels (I and Q), its own scenario (the vehicles it is simulating) and its own transport state (stopped, playing, paused). #
+# The sine waves for a station are created only when its scenario is loaded, so that playing them only needs to copy the data into the sound card's buffer.       #
+#-----------------------------------------------------------------------------------------------------------------------------------------------------------------#
+
+class Station(object):
+    """ A single test bench, which plays the sine waves for its scenario on its own pair of output channels. Stations are normally created by a StationManager,
+which mixes all of its stations into one multichannel output stream. """
+
+    #These are the states a station's transport can be in
+    STOPPED = 'STOPPED'
+    PLAYING = 'PLAYING'
+    PAUSED = 'PAUSED'
+
+    def __init__(self, name, mapping = (1, 2), frequency_sample = MainWindow.FREQUENCY_SAMPLE, store = None):
+        """ The 'name' parameter is used to identify the station, and 'mapping' holds the two output channels (starting at 1, just like MainWindow.MAPPING) that
+the I and Q sine waves are played on. If a RenderStore is given as 'store', the sine waves are taken from (and saved to) the store, and every time the station
+is played a test record is logged in it. """
+
+        self.name = name                                #The name used to identify the station
+        self.mapping = numpy.array(mapping, dtype = int) #The output channels (I and Q) used by the station
+        self.frequency_sample = frequency_sample        #The frequency sample used when creating the station's sine waves
+        self.store = store                              #The RenderStore the sine waves are kept in - None if they are always created
+
+        self.channels = None        #The sine wave data for the current scenario - None if no scenario has been loaded yet
+        self.scale = 1.0            #What the sine wave data is multiplied by when it is played, to keep it within range
+        self.scenario = None        #The data used to create the sine waves of the current scenario
+        self.position = 0           #The index of the next sample to be played
+        self.state = Station.STOPPED
+        self.loop = False           #If True, the scenario starts over when it reaches its end instead of stopping
+        self.render_time = 0.0      #How long (in seconds) it took to create the sine waves for the current scenario
+        self.recorded = False       #True once a test record has been logged for the current scenario (since it was loaded or the station was stopped)
+
+        self.cue_time = None        #When (using timeit.default_timer()) the last command changing the station was received - None once it has been played
+        self.latency = None         #How long (in seconds) it took from the last command being received to its audio being mixed into the output stream
+
+        self.lock = threading.Lock() #Used to keep the audio thread from reading the station while it is being changed
+
+        self._columns = self.mapping - 1 #The columns of the output buffer for the mapping (sounddevice counts channels from 1, numpy from 0)
+
+
+    #------------------------------------------------------------------------------------------------------------------------------------------------------#
+    # This method creates the sine waves for a scenario. The vehicle data is the same as the list used by 'MainWindow.run()' for the advanced window: one  #
+    # list of [speed, direction, amplitude] for each vehicle.                                                                                              #
+    #------------------------------------------------------------------------------------------------------------------------------------------------------#
+
+    def load(self, vehicle_data, duration, trans_freq, is_metric = False, received = None):
+        """ This method creates the sine waves for the passed vehicles and makes them the station's current scenario. The position is set back to the start, but
+the transport state is kept, so that a playing station keeps playing with the new scenario. If an error occurs, the error string is returned and the current
+scenario is left untouched; otherwise None is returned. The 'received' parameter is the same as for 'play()' (it is only used if the station is playing,
+since otherwise the new scenario is not heard yet). """
+
+        if vehicle_data == []: #If no vehicles were given, there is nothing to simulate
+            return 'DATA ERROR'
+
+        start_time = timeit.default_timer()
+
+        #Create the sine waves for each vehicle (or get them from the render store) and add them all together into one main channel
+        main_channel = None
+        artifacts = [] #The hashes of the stored sine waves that were used
+
+        for vehicle in vehicle_data:
+            if self.store != None:
+                channels = self.store.get_sine(vehicle[0], vehicle[1], duration, vehicle[2], trans_freq, is_metric, self.frequency_sample)
+
+                if type(channels) != str: #The store returns the hash of the sine wave along with its data
+                    artifacts.append(channels[0])
+                    channels = channels[1]
+            else:
+                channels = create_sine_data(vehicle[0], vehicle[1], duration, vehicle[2], trans_freq, is_metric, self.frequency_sample)
+
+            #Check if an error message was returned - if so, 'channels' will not be a numpy array but a string, and the scenario cannot be loaded
+            if type(channels) == str:
+                return channels
+
+            if main_channel is None:
+                main_channel = channels
+            else:
+                main_channel = main_channel + channels
+
+        #If the duration was 0 (or less), then there are no samples to play
+        if main_channel.size == 0:
+            return 'DATA ERROR'
+
+        #Scale the whole array down by its maximum value (to keep within range), the same as 'MainWindow.run()' does. The scaling is done while playing, so
+        #that a single stored sine wave can be played straight from the store without being copied.
+        maximum = numpy.amax(numpy.abs(main_channel))
+        if maximum > 0:
+            scale = 1.0/maximum
+        else:
+            scale = 1.0
+
+        render_time = timeit.default_timer() - start_time
+
+        #Now swap in the new scenario (the lock keeps the audio thread from playing half of the old data and half of the new)
+        with self.lock:
+            self.channels = main_channel
+            self.scale = scale
+            self.scenario = {'vehicles': [list(vehicle) for vehicle in vehicle_data], 'duration': duration, 'trans_freq': trans_freq, 'is_metric': is_metric,
+                             'artifacts': artifacts}
+            self.position = 0
+            self.render_time = render_time
+
+            #If the station is already playing, the new scenario is heard right away, so it needs a test record of its own
+            playing = self.state == Station.PLAYING
+            self.recorded = playing
+            scenario = self.scenario
+
+            if playing and received != None:
+                self.cue_time = received
+
+        if playing and self.store != None:
+            self.store.log_record({'station': self.name, 'event': 'update', 'scenario': scenario})
+
+        return None
+
+
+    #-----------------------------------------------------------#
+    # Here are the methods that control the station's transport #
+    #-----------------------------------------------------------#
+
+    def play(self, loop = None, received = None):
+        """ This method starts (or resumes) playing the station's scenario. If 'loop' is given, it changes whether the scenario starts over when it ends. If no
+scenario has been loaded, 'DATA ERROR' is returned; otherwise None is returned. If the station has a render store, a test record (with the hashes of the
+sine waves being played) is logged in it - once for each scenario, or again after the station has been stopped, but not when a paused station is resumed.
+
+If 'received' is given, it is the time (from timeit.default_timer()) that the command to play arrived. The next time the station is mixed into the output
+stream, the time since then is saved as the station's latency. (It is set along with the state, so the audio thread cannot measure it too early.) """
+        with self.lock:
+            if self.channels is None:
+                return 'DATA ERROR'
+
+            if loop != None:
+                self.loop = loop
+
+            if received != None and self.state != Station.PLAYING: #A station that is already playing was cued when its scenario was loaded (if at all)
+                self.cue_time = received
+
+            self.state = Station.PLAYING
+
+            record = not self.recorded #Only log a record if this scenario has not been heard since it was loaded (or since the station was stopped)
+            self.recorded = True
+            scenario = self.scenario
+
+        if record and self.store != None:
+            self.store.log_record({'station': self.name, 'event': 'play', 'scenario': scenario})
+
+        return None
+
+    def pause(self, received = None):
+        """ This method pauses the station, keeping its position so that playing it again resumes where it left off. The 'received' parameter is the same as
+for 'play()'. """
+        with self.lock:
+            if received != None:
+                self.cue_time = received
+
+            if self.state == Station.PLAYING:
+                self.state = Station.PAUSED
+
+    def stop(self, received = None):
+        """ This method stops the station and sets its position back to the start of the scenario. Playing it again counts as a new test. The 'received'
+parameter is the same as for 'play()'. """
+        with self.lock:
+            if received != None:
+                self.cue_time = received
+
+            self.state = Station.STOPPED
+            self.position = 0
+            self.recorded = False
+
+
+    #-----------------------------------------------------------------------------------------------------------------------------------------------#
+    # This method is called from the audio thread to add the station's next block of samples into the (multichannel) output buffer of the stream.   #
+    #-----------------------------------------------------------------------------------------------------------------------------------------------#
+
+    def fill(self, outdata, frames):
+        """ This method adds the next 'frames' samples of the station's scenario into its two columns of 'outdata'. Nothing is added if the station is not
+playing. """
+        with self.lock:
+            if self.cue_time != None: #If a command is waiting to be heard, then this is the first block of audio since it was received
+                self.latency = timeit.default_timer() - self.cue_time
+                self.cue_time = None
+
+            if self.state != Station.PLAYING:
+                return
+
+            written = 0
+            total = len(self.channels)
+
+            while written < frames:
+                chunk = self.channels[self.position:self.position + frames - written] #As much data as is left in the scenario (up to what the buffer needs)
+                outdata[written:written + len(chunk), self._columns] += chunk * self.scale
+
+                written += len(chunk)
+                self.position += len(chunk)
+
+                if self.position >= total: #If the end of the scenario was reached, either start over or stop the station
+                    self.position = 0
+
+                    if not self.loop or total == 0:
+                        self.state = Station.STOPPED
+                        self.recorded = False #Playing it again counts as a new test, the same as after 'stop()'
+                        break
+
+
+    def get_status(self):
+        """ This method returns a dictionary describing the station - its channels, transport state, position (in seconds) and current scenario. """
+        with self.lock:
+            return {'name': self.name, 'mapping': [int(channel) for channel in self.mapping], 'state': self.state, 'loop': self.loop,
+                    'position': self.position / float(self.frequency_sample), 'scenario': self.scenario, 'render_time': self.render_time,
+                    'latency': self.latency}
+
+
+
+#-------------------------------------------------------------------------------------------------------------------------------------------------------------#
+# This class is used to run several stations from one process. Instead of calling sounddevice.play() for each one (where each call cancels the one before),   #
+# all the stations are mixed into a single multichannel OutputStream inside its callback. The time spent in the callback is measured, so that the real-time   #
+# headroom (how much of each buffer's duration is left over after mixing) can be reported.                                                                    #
+#-------------------------------------------------------------------------------------------------------------------------------------------------------------#
+
+class StationManager(object):
+    """ This class manages several Station objects and plays all of them through one multichannel output stream. """
+
+    def __init__(self, num_channels = 2, frequency_sample = MainWindow.FREQUENCY_SAMPLE, device = None, blocksize = 0, stream_class = None, store = None):
+        """ The 'num_channels' parameter is the number of output channels opened on the sound card ('device', or the default device if None). The 'stream_class'
+parameter is the class used to create the output stream; if it is None, sounddevice.OutputStream is used, unless a different sink is wanted. If a RenderStore
+is given as 'store', it is shared by all of the stations. """
+
+        self.num_channels = num_channels
+        self.frequency_sample = frequency_sample
+        self.device = device
+        self.blocksize = blocksize
+        self.stream_class = stream_class
+        self.store = store
+
+        self.stream = None      #The output stream - None while the manager is not running
+        self.stations = {}      #The stations, stored by their names
+
+        self.lock = threading.Lock()    #Used when adding and removing stations
+        self._active = ()               #The stations that the audio callback goes through (replaced as a whole, so the callback never needs the lock)
+
+        self.reset_headroom()
+
+
+    #-------------------------------------------------------#
+    # Here are the methods for adding and removing stations #
+    #-------------------------------------------------------#
+
+    def add_station(self, name, mapping):
+        """ This method creates a new station called 'name' playing on the two channels in 'mapping' and returns it. If the name is already used, 'STATION ERROR'
+is returned; if the channels are not available (out of range or used by another station), 'CHANNEL ERROR' is returned. """
+        with self.lock:
+            if name in self.stations:
+                return 'STATION ERROR'
+
+            #Check that the mapping is a pair of different channels within the stream, not used by any other station
+            used = set()
+            for station in self.stations.values():
+                used.update(int(channel) for channel in station.mapping)
+
+            try:
+                mapping = list(mapping)
+            except TypeError: #The mapping is not a list (or tuple) of channels at all
+                return 'CHANNEL ERROR'
+
+            if len(mapping) != 2:
+                return 'CHANNEL ERROR'
+
+            channels = []
+
+            for channel in mapping:
+                #Each channel has to be a whole number (not True/False, which Python also counts as numbers, and not text)
+                if isinstance(channel, (bool, str, type(u''))):
+                    return 'CHANNEL ERROR'
+
+                try:
+                    if int(channel) != channel:
+                        return 'CHANNEL ERROR'
+                except (TypeError, ValueError, OverflowError): #Not a number, or not a finite one
+                    return 'CHANNEL ERROR'
+
+                channels.append(int(channel))
+
+            if channels[0] == channels[1]:
+                return 'CHANNEL ERROR'
+
+            for channel in channels:
+                if channel < 1 or channel > self.num_channels or channel in used:
+                    return 'CHANNEL ERROR'
+
+            station = Station(name, channels, self.frequency_sample, self.store)
+
+            self.stations[name] = station
+            self._active = tuple(self.stations.values())
+
+        return station
+
+    def remove_station(self, name):
+        """ This method stops and removes the station called 'name'. If there is no such station, 'STATION ERROR' is returned; otherwise None is returned. """
+        with self.lock:
+            if name not in self.stations:
+                return 'STATION ERROR'
+
+            station = self.stations.pop(name)
+            self._active = tuple(self.stations.values())
+
+        station.stop()
+        return None
+
+    def get_station(self, name):
+        """ This method returns the station called 'name', or None if there is no such station. """
+        return self.stations.get(name)
+
+
+    #------------------------------------------------------------------#
+    # Here are the methods for starting and stopping the output stream #
+    #------------------------------------------------------------------#
+
+    def start(self):
+        """ This method opens the multichannel output stream and starts it. """
+        if self.stream != None: #If the stream is already running, there is nothing to do
+            return
+
+        self.reset_headroom()
+
+        stream_class = self.stream_class
+
+        if stream_class == None: #Play on the sound card
+            if sounddevice == None:
+                raise ImportError("sounddevice is needed to play the stations on a sound card")
+
+            stream_class = sounddevice.OutputStream
+
+        self.stream = stream_class(samplerate = self.frequency_sample, blocksize = self.blocksize, device = self.device, channels = self.num_channels,
+                                   dtype = 'float32', callback = self._callback)
+        self.stream.start()
+
+    def stop(self):
+        """ This method stops and closes the output stream. The stations (and their positions) are kept. """
+        if self.stream == None:
+            return
+
+        self.stream.stop()
+        self.stream.close()
+        self.stream = None
+
+
+    #-------------------------------------------------------------------------------------------------------------------------------------------------#
+    # Here are the methods that mix the stations together. '_callback()' is called by the output stream, while 'render()' can be used without one.    #
+    #-------------------------------------------------------------------------------------------------------------------------------------------------#
+
+    def mix(self, outdata, frames):
+        """ This method clears 'outdata' and adds the next 'frames' samples of every station into it. """
+        outdata.fill(0)
+
+        for station in self._active:
+            station.fill(outdata, frames)
+
+    def render(self, frames):
+        """ This method mixes the next 'frames' samples of every station into a new numpy array (one column per output channel) and returns it, without using
+the output stream. """
+        outdata = numpy.zeros((frames, self.num_channels), dtype = 'float32')
+        self.mix(outdata, frames)
+        return outdata
+
+    def _callback(self, outdata, frames, time_info, status):
+        """ This is the callback for the output stream, which mixes the stations and records how long that took compared to the length of the buffer. """
+        start_time = timeit.default_timer()
+
+        self.mix(outdata, frames)
+
+        elapsed = timeit.default_timer() - start_time
+        load = elapsed * self.frequency_sample / frames #The part of the buffer's duration that was spent mixing
+
+        self.callbacks += 1
+        self.busy_time += elapsed
+        self.audio_time += frames / float(self.frequency_sample)
+        self.peak_load = max(self.peak_load, load)
+
+        if status: #Any flag set by the stream (such as an output underflow) means the audio was not delivered in time
+            self.xruns += 1
+
+
+    #-----------------------------------------------------------------------------------#
+    # Here are the methods that report (and reset) the real-time headroom of the mixing #
+    #-----------------------------------------------------------------------------------#
+
+    def reset_headroom(self):
+        """ This method clears the measurements used for reporting the real-time headroom. """
+        self.callbacks = 0      #How many times the callback has been called
+        self.busy_time = 0.0    #The total time (in seconds) spent mixing in the callback
+        self.audio_time = 0.0   #The total time (in seconds) of audio that was mixed
+        self.peak_load = 0.0    #The highest part of a single buffer's duration spent mixing
+        self.xruns = 0          #How many callbacks reported a problem with the stream (such as underflows)
+
+    def get_headroom(self):
+        """ This method returns a dictionary with the real-time headroom of all the stations together. The 'load' is the part of the audio time spent mixing
+(on average and at its peak), and the 'headroom' is what is left over (1 - load); a headroom at or below 0 means the stations cannot be mixed in real time. """
+        if self.audio_time > 0:
+            load = self.busy_time / self.audio_time
+        else:
+            load = 0.0
+
+        return {'stations': len(self._active), 'callbacks': self.callbacks, 'load': load, 'peak_load': self.peak_load, 'headroom': 1.0 - load,
+                'peak_headroom': 1.0 - self.peak_load, 'xruns': self.xruns}
+
+    def get_status(self):
+        """ This method returns a dictionary describing the manager - whether the output stream is running (and its output latency, in seconds), the real-time
+headroom, and the status of each of its stations. """
+        if self.stream != None:
+            output_latency = self.stream.latency #How long the sound card takes to play what was written into its buffer
+        else:
+            output_latency = None
+
+        return {'running': self.stream != None, 'output_latency': output_latency, 'headroom': self.get_headroom(),
+                'stations': [station.get_status() for station in self._active]}
+
+
+
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------#
+# This class is an output stream that plays into nothing. It calls the callback from its own thread at the same pace as a sound card would, so that the        #
+# StationManager (and the control server) can be run and tested on computers without the test hardware. It has the same methods as sounddevice.OutputStream    #
+# that the StationManager uses, so it can be passed as the manager's 'stream_class'.                                                                           #
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------#
+
+class NullOutputStream(object):
+    """ An output stream that throws away the audio, while calling the callback in real time just like sounddevice.OutputStream. """
+
+    BLOCKSIZE = 512 #The number of frames in each buffer if no blocksize is given
+
+    def __init__(self, samplerate, channels, callback, blocksize = 0, dtype = 'float32', device = None):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.callback = callback
+        self.blocksize = blocksize or NullOutputStream.BLOCKSIZE
+        self.dtype = dtype
+        self.device = device        #Not used - there is no device
+
+        self.latency = 0.0          #There is no sound card, so the audio is "played" as soon as it is mixed
+        self.active = False
+        self.frames_played = 0      #How many frames have been passed through the callback
+
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def start(self):
+        """ This method starts calling the callback from a new thread. """
+        if self.active:
+            return
+
+        self._stopping.clear()
+        self.active = True
+
+        self._thread = threading.Thread(target = self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """ This method stops calling the callback, waiting for the current buffer to finish. """
+        if not self.active:
+            return
+
+        self._stopping.set()
+        self._thread.join()
+        self.active = False
+
+    def close(self):
+        """ This method closes the stream (stopping it first if it is running). """
+        self.stop()
+
+    def _run(self):
+        """ This method calls the callback for one buffer at a time, waiting between buffers so that the audio goes by in real time. """
+        buffer_time = self.blocksize / float(self.samplerate) #How long each buffer would take to play
+        next_time = timeit.default_timer()
+
+        while not self._stopping.is_set():
+            outdata = numpy.zeros((self.blocksize, self.channels), dtype = self.dtype)
+            self.callback(outdata, self.blocksize, None, 0)
+            self.frames_played += self.blocksize
+
+            #Wait until the buffer would have finished playing (or until the stream is stopped)
+            next_time += buffer_time
+            self._stopping.wait(max(0.0, next_time - timeit.default_timer()))
+
+
+
+#---------------------------------------------------------------------------------------------------------------------------------------------------------------#
+# These classes set up an optional control server, so that test automation can drive a StationManager without going through the GUI. The server listens on a    #
+# local TCP port (or a Unix socket) and reads one JSON object (a command) on each line, answering each with one JSON object on a line of its own.               #
+#                                                                                                                                                               #
+# The commands are handled on an asyncio event loop in a thread of its own, separate from the audio thread that mixes the stations. Creating the sine waves for #
+# a 'start' or 'update' command is done in a worker thread, so that a long scenario does not hold up the commands of other clients.                             #
+#                                                                                                                                                               #
+# NOTE: asyncio is only included with Python 3, so the control server cannot be used with Python 2 (the rest of the program still can).                         #
+#---------------------------------------------------------------------------------------------------------------------------------------------------------------#
+
+class ControlProtocol(object):
+    """ This class handles a single connection to the ControlServer (it is used as an asyncio protocol). The commands from each connection are answered in the
+order they were sent. """
+
+    MAX_LINE = 65536 #The longest a single command is allowed to be (in bytes)
+
+    def __init__(self, server):
+        self.server = server                    #The ControlServer that the connection was made to
+        self.transport = None                   #The asyncio transport for the connection
+        self.buffer = b''                       #Holds the start of a command until the rest of its line arrives
+        self.pending = collections.deque()      #The commands (with the times they were received) that are waiting to be handled
+        self.busy = False                       #True while a command is being handled in a worker thread
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        """ This method splits the received data into lines and handles each complete line as a command. """
+        received = timeit.default_timer() #The time the commands arrived, used for measuring the latency to the audio
+
+        self.buffer += data
+        lines = self.buffer.split(b'\n')
+        self.buffer = lines.pop() #The last piece is not a complete line yet (or is empty)
+
+        if len(self.buffer) > ControlProtocol.MAX_LINE: #Throw away a line that is too long instead of holding on to it
+            self.buffer = b''
+            self.pending.append((None, received))
+
+        for line in lines:
+            if line.strip():
+                self.pending.append((line, received))
+
+        self._handle_next()
+
+    def eof_received(self):
+        return False #Close the connection when the client is done sending
+
+    def connection_lost(self, exc):
+        self.transport = None
+        self.pending.clear()
+
+    def _handle_next(self):
+        """ This method handles the waiting commands in order until one of them has to wait for a worker thread. """
+        while not self.busy and self.pending:
+            line, received = self.pending.popleft()
+
+            try:
+                message = json.loads(line.decode('utf-8'))
+            except (AttributeError, ValueError): #A line that is too long (None) or not JSON
+                message = None
+
+            if type(message) != dict:
+                self._respond({'ok': False, 'error': 'JSON ERROR'})
+
+            elif message.get('command') in ControlServer.RENDER_COMMANDS: #If sine waves have to be created, do it in a worker thread
+                self.busy = True
+                future = self.server.loop.run_in_executor(None, self.server.handle_command, message, received)
+                future.add_done_callback(self._handled)
+
+            else: #Otherwise, handle it right here (guarded the same way as commands handled in a worker thread)
+                try:
+                    response = self.server.handle_command(message, received)
+                except Exception:
+                    response = {'ok': False, 'error': 'SERVER ERROR'}
+
+                self._respond(response)
+
+    def _handled(self, future):
+        """ This method is called (on the event loop) when a worker thread has finished handling a command. """
+        self.busy = False
+
+        try:
+            self._respond(future.result())
+        except Exception:
+            self._respond({'ok': False, 'error': 'SERVER ERROR'})
+
+        self._handle_next()
+
+    def _respond(self, response):
+        """ This method sends the response to the client as a line of JSON. """
+        if self.transport != None:
+            self.transport.write((json.dumps(response) + '\n').encode('utf-8'))
+
+
+
+class ControlServer(object):
+    """ This class is a local control server for a StationManager. Each line sent to it is a JSON object with a 'command' and (for most commands) a
+'station':
+
+    start   - (creates the station if a 'mapping' is given,) loads a scenario and plays it
+    update  - loads a new scenario into the station, keeping its transport state
+    pause   - pauses the station
+    stop    - stops the station
+    status  - returns the status of the station (or of the whole manager if no station is given)
+
+The scenario for 'start' and 'update' uses the same data as 'create_sine()': either a list of 'vehicles' ([speed, direction, amplitude] for each) or a single
+'speed', 'direction' and 'amplitude', as well as the 'duration', the transmit frequency ('trans_freq' in Hz, or the name of a 'band' in MainWindow.BANDS)
+and whether the speeds are 'metric'. For 'update', anything that is left out is kept from the station's current scenario.
+
+Each answer has 'ok' set to True, or to False with an 'error' string (the same strings used by 'create_error_window()'). If the command has an 'id', it is
+sent back with the answer. The 'latency' in a station's status is how long it took from its last command arriving to that command being heard. """
+
+    RENDER_COMMANDS = ('start', 'update')                               #The commands that create sine waves (handled in a worker thread)
+    COMMANDS = ('start', 'update', 'pause', 'stop', 'status')           #All of the commands the server knows
+
+    def __init__(self, manager, host = '127.0.0.1', port = 0, path = None):
+        """ The server controls the stations of 'manager'. It listens on 'host' and 'port' (port 0 lets the operating system choose a free one), or on the
+Unix socket 'path' if one is given. """
+
+        self.manager = manager
+        self.host = host
+        self.port = port
+        self.path = path
+
+        self.loop = None        #The asyncio event loop the commands are handled on
+        self.server = None      #The asyncio server
+        self.address = None     #The address the server is listening on (found once it has started)
+
+        self._thread = None
+        self._ready = threading.Event()
+        self._error = None      #Holds any exception raised while the server was starting
+
+
+    #-------------------------------------------------------------------------#
+    # Here are the methods that start and stop the server (in its own thread) #
+    #-------------------------------------------------------------------------#
+
+    def start(self):
+        """ This method starts the server in a new thread and waits until it is listening. Any error raised while starting (such as the port already being
+in use) is raised again here. """
+        import asyncio #Only imported here, since asyncio is not available with Python 2
+
+        self.loop = asyncio.new_event_loop()
+        self._ready.clear()
+        self._error = None
+
+        self._thread = threading.Thread(target = self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+        self._ready.wait()
+
+        if self._error != None:
+            self._thread.join()
+            raise self._error
+
+    def stop(self):
+        """ This method stops the server and waits for its thread to finish. """
+        if self._thread == None:
+            return
+
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        """ This method runs the event loop of the server (in the server's own thread). """
+        loop = self.loop
+
+        try:
+            if self.path != None:
+                self.server = loop.run_until_complete(loop.create_unix_server(lambda: ControlProtocol(self), self.path))
+            else:
+                self.server = loop.run_until_complete(loop.create_server(lambda: ControlProtocol(self), self.host, self.port))
+
+            self.address = self.server.sockets[0].getsockname()
+
+        except Exception as error:
+            self._error = error
+            loop.close()
+            self._ready.set()
+            return
+
+        self._ready.set()
+        loop.run_forever()
+
+        #The loop was stopped, so close the server and the loop
+        self.server.close()
+        loop.run_until_complete(self.server.wait_closed())
+        loop.close()
+
+
+    #-------------------------------------------------------------------------------#
+    # Here are the methods that handle the commands (called by the ControlProtocol) #
+    #-------------------------------------------------------------------------------#
+
+    def handle_command(self, message, received):
+        """ This method handles a single command (a dictionary read from JSON) that was received at the time 'received' and returns the answer to send. """
+        response = self._handle(message, received)
+
+        if 'id' in message: #Send the id back, so that the client can match the answer to its command
+            response['id'] = message['id']
+
+        response['handling_time'] = timeit.default_timer() - received #How long the command took to handle (in seconds)
+        return response
+
+    def _handle(self, message, received):
+        """ This method does the work for 'handle_command()'. """
+        command = message.get('command')
+        name = message.get('station')
+
+        if command not in ControlServer.COMMANDS:
+            return {'ok': False, 'error': 'COMMAND ERROR'}
+
+        if name != None and not isinstance(name, (str, type(u''))): #Stations are named with text
+            return {'ok': False, 'error': 'STATION ERROR'}
+
+        if command == 'status' and name == None: #Without a station, give the status of the whole manager
+            return {'ok': True, 'status': self.manager.get_status()}
+
+        if name == None: #Every other command needs the name of a station (so that a 'start' cannot create a station without one)
+            return {'ok': False, 'error': 'STATION ERROR'}
+
+        station = self.manager.get_station(name)
+        created = False #True if the station is created by this command
+
+        if station == None and command == 'start' and 'mapping' in message: #A new station can be created when it is started
+            station = self.manager.add_station(name, message['mapping'])
+
+            if type(station) == str:
+                return {'ok': False, 'error': station}
+
+            created = True
+
+        if station == None:
+            return {'ok': False, 'error': 'STATION ERROR'}
+
+        response = None
+
+        try:
+            response = self._change(station, command, message, received)
+        finally:
+            #Do not leave a station behind (holding on to its channels) when it could not be started - whether an error string was returned or an
+            #exception was raised
+            if created and (response == None or not response['ok']):
+                self.manager.remove_station(name)
+
+        return response
+
+    def _change(self, station, command, message, received):
+        """ This method does the work for 'command' on 'station' (which has already been found or created) and returns the answer to send. """
+        if command == 'status':
+            return {'ok': True, 'status': station.get_status()}
+
+        #Create the sine waves for the new scenario (if any)
+        if command in ControlServer.RENDER_COMMANDS:
+            error = self._load(station, message, received)
+
+            if error != None:
+                return {'ok': False, 'error': error}
+
+        #Each change is passed the time the command arrived, so the latency until it is heard can be measured
+        if command == 'start':
+            error = station.play(message.get('loop'), received)
+
+            if error != None:
+                return {'ok': False, 'error': error}
+
+        elif command == 'pause':
+            station.pause(received)
+
+        elif command == 'stop':
+            station.stop(received)
+
+        return {'ok': True}
+
+    def _load(self, station, message, received):
+        """ This method loads the scenario in 'message' (received at the time 'received') into 'station', keeping anything left out from the station's
+current scenario. The error string is returned if the scenario cannot be loaded; otherwise None is returned. """
+        scenario = dict(station.scenario or {})
+
+        #Get the vehicle data - either a whole list of vehicles or a single vehicle
+        if 'vehicles' in message:
+            scenario['vehicles'] = message['vehicles']
+        elif 'speed' in message or 'direction' in message or 'amplitude' in message:
+            vehicle = [None, None, 1] #The speed, direction and amplitude (which is 1 by default, the same as 'create_sine()')
+
+            if len(scenario.get('vehicles', [])) == 1: #If there is only one vehicle already, keep anything about it that is left out
+                vehicle = list(scenario['vehicles'][0])
+
+            for i, key in enumerate(('speed', 'direction', 'amplitude')):
+                if key in message:
+                    vehicle[i] = message[key]
+
+            scenario['vehicles'] = [vehicle]
+
+        if 'duration' in message:
+            scenario['duration'] = message['duration']
+
+        if 'metric' in message:
+            scenario['is_metric'] = bool(message['metric'])
+
+        #Get the transmit frequency - either given directly (in Hz) or using the name of the band
+        if 'trans_freq' in message:
+            scenario['trans_freq'] = message['trans_freq']
+        elif 'band' in message:
+            scenario['trans_freq'] = MainWindow.BANDS.get_frequency(message['band'])
+
+        if 'vehicles' not in scenario or 'duration' not in scenario or type(scenario['vehicles']) != list:
+            return 'DATA ERROR'
+
+        for vehicle in scenario['vehicles']:
+            if type(vehicle) != list or len(vehicle) != 3:
+                return 'DATA ERROR'
+
+        trans_freq = scenario.get('trans_freq')
+
+        if check_trans_freq(trans_freq) != None: #Not given (or no such band), or not a positive number
+            return 'TRANSMIT FREQ ERROR'
+
+        return station.load(scenario['vehicles'], scenario['duration'], float(trans_freq), scenario.get('is_metric', False), received)
+
+
+
+#-----------------------------------------------------------------------------------------------------------------------------------------------------------#
+# This class is used to verify (for NIST traceability) that the sine waves that were created match what they should be: that their frequency is the Doppler #
+# frequency from 'calc_frequency()', and that the second (Q) channel is 1.9 times the first (I) channel and shifted by +/- pi/2 depending on the direction. #
+#                                                                                                                                                           #
+# Many tones are checked at once: they are stacked into one numpy array, windowed, and run through numpy's 'rfft' together. The frequency of each tone is   #
+# found from the peak of its spectrum (interpolated between the frequency bins), and the gain and phase offset between the channels from the peak bin.      #
+#-----------------------------------------------------------------------------------------------------------------------------------------------------------#
+
+class VerificationEngine(object):
+    """ This class measures the frequency, I/Q gain and phase offset of created sine waves, compares them with the expected values, and creates a certification
+report of the results. """
+
+    EXPECTED_GAIN = 1.9             #The second (Q) channel is 1.9 times the first (I) channel (see 'create_sine_data()')
+
+    FREQUENCY_TOLERANCE = 1e-3      #The largest allowed frequency error, as a part of the expected frequency (0.1 %)...
+    BIN_TOLERANCE = 1e-2            #...or as a part of the width of an FFT bin (1 %), whichever is larger - so low tones are not held to more than the FFT can see
+    GAIN_TOLERANCE = 1e-2           #The largest allowed error in the I/Q gain, as a part of the expected gain (1 %)
+    PHASE_TOLERANCE = 1e-2          #The largest allowed error in the phase offset between the channels (in radians)
+
+    ANALYSIS_SIZE = 32768           #The most samples of each tone that are usually analyzed (longer tones only have their start analyzed)
+    PEAK_BINS = 8                   #More samples than ANALYSIS_SIZE are analyzed (if the tone is long enough) to put a low tone at least this many bins above 0 Hz
+    MIN_CYCLES = 3                  #The fewest cycles of a tone that must be analyzed for it to be measured (closer to 0 Hz, its spectrum overlaps its mirror image)
+    MIN_SIZE = 64                   #The fewest samples a tone can have and still be analyzed
+    BATCH_SIZE = 64                 #How many tones are run through the FFT at once
+
+    def __init__(self, frequency_sample = MainWindow.FREQUENCY_SAMPLE, analysis_size = ANALYSIS_SIZE, batch_size = BATCH_SIZE, store = None):
+        """ If a RenderStore is given as 'store', 'verify_vehicles()' verifies the stored sine waves (creating any that are missing), and each result records
+the hash of the sine wave it was measured on. """
+        self.frequency_sample = frequency_sample
+        self.analysis_size = analysis_size
+        self.batch_size = batch_size
+        self.store = store
+
+        #The tolerances can be changed for each engine (they start as the class defaults)
+        self.frequency_tolerance = VerificationEngine.FREQUENCY_TOLERANCE
+        self.bin_tolerance = VerificationEngine.BIN_TOLERANCE
+        self.gain_tolerance = VerificationEngine.GAIN_TOLERANCE
+        self.phase_tolerance = VerificationEngine.PHASE_TOLERANCE
+
+
+    #----------------------------------------------------------------------------------------------------------------------------------------------------#
+    # This method does the actual measuring. It takes a block of tones that all have the same length, with the shape (tones, samples, 2) - that is, the  #
+    # channel arrays returned by 'create_sine_data()' stacked on top of each other.                                                                      #
+    #----------------------------------------------------------------------------------------------------------------------------------------------------#
+
+    def analyze(self, block):
+        """ This method measures every tone in 'block' (a numpy array with the shape (tones, samples, 2)) and returns a dictionary of numpy arrays with one value
+for each tone: the 'frequency' (in Hz), the 'amplitude' of the first channel, the 'gain' of the second channel compared to the first, and the 'phase' offset
+between them (in radians, positive when the second channel lags the first). """
+        size = block.shape[1]
+        window = numpy.hanning(size + 1)[:-1] #The periodic Hann window, which the interpolation below is exact for
+
+        #Run the windowed channels through the FFT, all of the tones at once
+        spectrum_1 = numpy.fft.rfft(block[:, :, 0] * window, axis = 1)
+        spectrum_2 = numpy.fft.rfft(block[:, :, 1] * window, axis = 1)
+
+        #Find the peak of each tone's spectrum (using both channels), skipping the first and last bins so that there is a bin on either side of the peak
+        magnitude = numpy.sqrt(numpy.abs(spectrum_1)**2 + numpy.abs(spectrum_2)**2)
+        rows = numpy.arange(len(block))
+        peak = numpy.argmax(magnitude[:, 1:-1], axis = 1) + 1
+
+        #Interpolate between the bins around the peak to find where the real peak lies. For a single tone under a Hann window, the offset from the peak bin
+        #is exactly 2 * (right - left) / (left + 2 * center + right), using the magnitudes of the three bins (so the estimate has no bias of its own)
+        tiny = numpy.finfo(float).tiny #Used to keep from dividing by zero
+        left = magnitude[rows, peak - 1]
+        center = magnitude[rows, peak]
+        right = magnitude[rows, peak + 1]
+
+        offset = 2 * (right - left) / numpy.maximum(left + 2 * center + right, tiny)
+        offset = numpy.clip(offset, -0.5, 0.5)
+
+        frequency = (peak + offset) * self.frequency_sample / size
+
+        #Measure the channels at the peak. The amplitude is corrected for the window and for the peak falling between bins (the Hann window's response)
+        value_1 = spectrum_1[rows, peak]
+        value_2 = spectrum_2[rows, peak]
+
+        response = numpy.sinc(offset) / (1 - offset**2)
+        amplitude = 2 * numpy.abs(value_1) / (numpy.sum(window) * response)
+
+        gain = numpy.abs(value_2) / numpy.maximum(numpy.abs(value_1), tiny)
+        phase = numpy.angle(value_1 * numpy.conj(value_2))
+
+        return {'frequency': frequency, 'amplitude': amplitude, 'gain': gain, 'phase': phase}
+
+
+    #-------------------------------------------------------------------------------------------------------------#
+    # These methods compare the measurements with the expected values and return one result for each tone checked #
+    #-------------------------------------------------------------------------------------------------------------#
+
+    def verify(self, block, frequencies, directions, labels = None):
+        """ This method measures the tones in 'block' (see 'analyze()') and compares each one with its expected frequency (in 'frequencies') and direction (in
+'directions' - True for approaching, which puts the second channel pi/2 behind the first, or False for receding). A list with a result dictionary for each tone
+is returned. """
+        measured = self.analyze(block)
+
+        #A negative frequency (from a negative speed) creates the same sine wave as the positive frequency in the other direction, since cos(-x) = cos(x). The
+        #measured frequency is always positive, so the sign is folded into the expected phase instead.
+        expected_frequency = numpy.asarray(frequencies, dtype = float)
+        reversed_direction = numpy.asarray(directions, dtype = bool) != (expected_frequency < 0)
+
+        expected_frequency = numpy.abs(expected_frequency)
+        expected_phase = numpy.where(reversed_direction, numpy.pi/2, -numpy.pi/2)
+
+        #The resolution of the measurement is the width of one FFT bin, and a tone with too few cycles cannot be told apart from its mirror image (below 0 Hz)
+        resolution = self.frequency_sample / float(block.shape[1])
+        measurable = expected_frequency >= VerificationEngine.MIN_CYCLES * resolution
+
+        #Find the errors for all the tones at once
+        frequency_error = measured['frequency'] - expected_frequency
+        relative_error = numpy.abs(frequency_error) / numpy.maximum(expected_frequency, numpy.finfo(float).tiny)
+        frequency_tolerance = numpy.maximum(self.frequency_tolerance * expected_frequency, self.bin_tolerance * resolution) #In Hz
+        gain_error = (measured['gain'] - VerificationEngine.EXPECTED_GAIN) / VerificationEngine.EXPECTED_GAIN
+        phase_error = (measured['phase'] - expected_phase + numpy.pi) % (2 * numpy.pi) - numpy.pi #Wrapped into the range -pi to pi
+
+        passed = ((numpy.abs(frequency_error) <= frequency_tolerance) & (numpy.abs(gain_error) <= self.gain_tolerance) &
+                  (numpy.abs(phase_error) <= self.phase_tolerance))
+
+        results = []
+
+        for i in range(len(block)):
+            if labels != None:
+                label = labels[i]
+            else:
+                label = str(i + 1)
+
+            if not measurable[i]: #The tone is too close to 0 Hz for the number of samples analyzed, so it cannot be verified
+                result = self._error_result(label, {'direction': directions[i], 'frequency': float(expected_frequency[i])}, 'RESOLUTION ERROR')
+                result['resolution'] = resolution
+                results.append(result)
+                continue
+
+            results.append({'label': label, 'direction': bool(directions[i]), 'expected_frequency': float(expected_frequency[i]), 'resolution': resolution,
+                            'frequency_tolerance': float(frequency_tolerance[i]),
+                            'frequency': float(measured['frequency'][i]), 'frequency_error': float(frequency_error[i]), 'relative_error': float(relative_error[i]),
+                            'amplitude': float(measured['amplitude'][i]), 'gain': float(measured['gain'][i]), 'gain_error': float(gain_error[i]),
+                            'phase': float(measured['phase'][i]), 'phase_error': float(phase_error[i]), 'passed': bool(passed[i]), 'error': None,
+                            'artifact': None})
+
+        return results
+
+    def verify_tones(self, tones):
+        """ This method verifies a list of tones, where each tone is a dictionary with its 'channels' (the numpy array from 'create_sine_data()'), its expected
+'frequency' (in Hz), its 'direction', and optionally a 'label' and the 'artifact' (render store hash) of its sine wave. The tones can have different
+lengths: tones analyzed with the same number of samples are stacked together and run through the FFT in batches. A list with a result dictionary for each
+tone (in the same order as 'tones') is returned. """
+        results = [None] * len(tones)
+        groups = {} #The indices of the tones, grouped by how many samples are analyzed for each
+
+        for i, tone in enumerate(tones):
+            size = min(len(tone['channels']), self.get_analysis_size(tone['frequency']))
+
+            if size < VerificationEngine.MIN_SIZE: #Too short to be measured
+                results[i] = self._error_result(tone.get('label', str(i + 1)), tone, 'DATA ERROR')
+            else:
+                groups.setdefault(size, []).append(i)
+
+        for size, indices in groups.items():
+            for start in range(0, len(indices), self.batch_size):
+                batch = indices[start:start + self.batch_size]
+
+                block = numpy.array([tones[i]['channels'][:size] for i in batch])
+                labels = [tones[i].get('label', str(i + 1)) for i in batch]
+
+                batch_results = self.verify(block, [tones[i]['frequency'] for i in batch], [tones[i]['direction'] for i in batch], labels)
+
+                for i, result in zip(batch, batch_results):
+                    result['artifact'] = tones[i].get('artifact')
+                    results[i] = result
+
+        return results
+
+    def verify_vehicles(self, vehicle_data, duration, trans_freq, is_metric = False):
+        """ This method creates the sine wave for each vehicle in 'vehicle_data' (a list of [speed, direction, amplitude], the same as for 'Station.load()') on
+its own (or gets it from the engine's render store) and verifies it against the frequency from the Doppler Equation. A list with a result dictionary for each
+vehicle is returned; vehicles whose sine waves could not be created have the error string in their result. """
+        tones = []
+        results = [None] * len(vehicle_data)
+
+        for i, vehicle in enumerate(vehicle_data):
+            label = '%s %s %s' % (vehicle[0], ['mph', 'kph'][bool(is_metric)], {True: 'approaching', False: 'receding'}.get(vehicle[1], 'no direction'))
+            artifact = None
+
+            if self.store != None:
+                channels = self.store.get_sine(vehicle[0], vehicle[1], duration, vehicle[2], trans_freq, is_metric, self.frequency_sample)
+
+                if type(channels) != str: #The store returns the hash of the sine wave along with its data
+                    artifact, channels = channels
+            else:
+                channels = create_sine_data(vehicle[0], vehicle[1], duration, vehicle[2], trans_freq, is_metric, self.frequency_sample)
+
+            if type(channels) == str:
+                results[i] = self._error_result(label, {'direction': vehicle[1]}, channels)
+            else:
+                frequency = doppler_frequency(speed_to_mps(float(vehicle[0]), is_metric), float(trans_freq))
+                tones.append({'channels': channels, 'frequency': frequency, 'direction': vehicle[1], 'label': label, 'index': i, 'artifact': artifact})
+
+        for tone, result in zip(tones, self.verify_tones(tones)):
+            results[tone['index']] = result
+
+        return results
+
+    def verify_sweep(self, trans_freqs, speeds, direction, duration, is_metric = False):
+        """ This method verifies a whole sweep: the sine waves for every transmit frequency in 'trans_freqs' (in Hz) and every speed in 'speeds' are created in
+blocks (see 'iter_sweep()') and verified as they are created. A list with a result dictionary for each tone is returned, going through every speed for the
+first transmit frequency, then every speed for the second, and so on. If the sine waves cannot be created (or there are no transmit frequencies or no speeds),
+the error string is returned instead. """
+        try:
+            trans_freqs = numpy.asarray(trans_freqs, dtype = float).ravel()
+            speeds = numpy.asarray(speeds, dtype = float).ravel()
+            duration = float(duration)
+        except (TypeError, ValueError):
+            return 'CONVERT ERROR'
+
+        if trans_freqs.size == 0 or speeds.size == 0: #There is nothing to verify
+            return 'DATA ERROR'
+
+        for trans_freq in trans_freqs:
+            if check_trans_freq(trans_freq) != None:
+                return 'TRANSMIT FREQ ERROR'
+
+        frequencies = doppler_grid(trans_freqs, speeds, is_metric).ravel()
+
+        labels = []
+        for trans_freq in trans_freqs:
+            for speed in speeds:
+                labels.append('%g %s @ %.4f GHz' % (speed, ['mph', 'kph'][bool(is_metric)], trans_freq / 1e9))
+
+        #Only the samples that are analyzed are created, so a long duration does not slow down the sweep. All the tones are analyzed with the same number of
+        #samples, enough for the lowest of them.
+        size = min(int(round(duration * self.frequency_sample)), self.get_analysis_size(numpy.amin(numpy.abs(frequencies))))
+
+        if size < VerificationEngine.MIN_SIZE: #Too short to be measured
+            return 'DATA ERROR'
+        results = []
+
+        for start, block in iter_sweep(frequencies, direction, size / float(self.frequency_sample), 1, self.frequency_sample, self.batch_size):
+            if type(block) == str:
+                return block
+
+            stop = start + len(block)
+            results.extend(self.verify(block, frequencies[start:stop], [direction] * len(block), labels[start:stop]))
+
+        return results
+
+    def get_analysis_size(self, frequency):
+        """ This method returns how many samples of a tone with the expected 'frequency' (in Hz) should be analyzed: the engine's analysis size, or more if
+that is needed to put the tone PEAK_BINS bins above 0 Hz. (The tone itself may be shorter than this.) """
+        frequency = abs(frequency) #A negative frequency is heard (and measured) as the positive one
+
+        if frequency > 0:
+            return max(self.analysis_size, int(numpy.ceil(VerificationEngine.PEAK_BINS * self.frequency_sample / frequency)))
+
+        return self.analysis_size
+
+    def _error_result(self, label, tone, error):
+        """ This method returns the result for a tone that could not be measured. """
+        return {'label': label, 'direction': tone.get('direction'), 'expected_frequency': tone.get('frequency'), 'resolution': None, 'frequency_tolerance': None,
+                'frequency': None, 'frequency_error': None, 'relative_error': None, 'amplitude': None, 'gain': None, 'gain_error': None, 'phase': None,
+                'phase_error': None, 'passed': False, 'error': error, 'artifact': None}
+
+
+    #-----------------------------------------------------------------------#
+    # These methods create the certification report from a list of results  #
+    #-----------------------------------------------------------------------#
+
+    def create_report(self, results, title = "NIST DTR Radar Target Simulator - Verification Report"):
+        """ This method returns the certification report (as a string) for the passed list of results: the settings used, a line for each tone, and a
+summary. """
+        lines = [title, "=" * len(title), ""]
+
+        lines.append("Created:           %s" % time.strftime("%Y-%m-%d %H:%M:%S"))
+        lines.append("Engine version:    %s" % ENGINE_VERSION)
+        lines.append("Frequency sample:  %g Hz" % self.frequency_sample)
+        lines.append("Analysis:          %d samples per tone (more for tones under %g Hz), periodic Hann window, interpolated FFT peak" %
+                     (self.analysis_size, VerificationEngine.PEAK_BINS * self.frequency_sample / self.analysis_size))
+        lines.append("Resolution:        one FFT bin (shown for each tone); tones with fewer than %d cycles analyzed cannot be measured" %
+                     VerificationEngine.MIN_CYCLES)
+        lines.append("Tolerances:        frequency %g %% or %g %% of a bin (whichever is larger), I/Q gain %g %% (of %g), phase %g rad" %
+                     (self.frequency_tolerance * 100, self.bin_tolerance * 100, self.gain_tolerance * 100, VerificationEngine.EXPECTED_GAIN, self.phase_tolerance))
+        lines.append("")
+
+        lines.append("%-6s %-28s %14s %14s %11s %9s %8s %11s %8s" % ("#", "Tone", "Expected (Hz)", "Measured (Hz)", "Error (%)", "Bin (Hz)", "Gain", "Phase (deg)",
+                                                                     "Result"))
+        lines.append("-" * 117)
+
+        for i, result in enumerate(results):
+            if result['error'] != None:
+                if result['resolution'] != None:
+                    resolution = "%9.4f" % result['resolution']
+                else:
+                    resolution = ""
+
+                lines.append("%-6d %-28s %14s %14s %11s %9s %8s %11s %8s" % (i + 1, result['label'], "", "", "", resolution, "", "", result['error']))
+            else:
+                lines.append("%-6d %-28s %14.3f %14.3f %11.5f %9.4f %8.4f %11.3f %8s" % (i + 1, result['label'], result['expected_frequency'], result['frequency'],
+                                                                                           result['relative_error'] * 100, result['resolution'], result['gain'],
+                                                                                           numpy.degrees(result['phase']), ["FAIL", "PASS"][result['passed']]))
+
+        #Finally, add the summary - how many tones passed and the largest errors that were measured
+        measured = [result for result in results if result['error'] == None]
+        passed = len([result for result in results if result['passed']])
+
+        lines.append("-" * 117)
+        lines.append("Tones checked: %d    Passed: %d    Failed: %d" % (len(results), passed, len(results) - passed))
+
+        if measured != []:
+            lines.append("Largest errors: frequency %.5f %%, I/Q gain %.5f %%, phase %.5f rad" % (max(abs(r['relative_error']) for r in measured) * 100,
+                                                                                             max(abs(r['gain_error']) for r in measured) * 100,
+                                                                                             max(abs(r['phase_error']) for r in measured)))
+
+        if passed == len(results) and results != []:
+            lines.append("Result: ALL TONES PASSED")
+        else:
+            lines.append("Result: NOT CERTIFIED")
+
+        #If the sine waves came from a render store, list their hashes, so that the exact sine wave each tone was measured on can be found later
+        artifacts = [(i + 1, result['artifact']) for i, result in enumerate(results) if result.get('artifact') != None]
+
+        if artifacts != []:
+            lines.append("")
+            lines.append("Sine waves (render store hashes):")
+
+            for number, artifact in artifacts:
+                lines.append("%-6d %s" % (number, artifact))
+
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, results, path, title = "NIST DTR Radar Target Simulator - Verification Report"):
+        """ This method writes the certification report for the passed list of results into the file at 'path'. """
+        report_file = open(path, 'w')
+
+        try:
+            report_file.write(self.create_report(results, title))
+        finally:
+            report_file.close()
+
+
+
+#----------End of Class Definitions----------#
+
+
+
+
+
+
+#----------Start of Function Definitions----------#
+
+
+#------------------------------------------------------------------------------------------------------------------------------------------------------------#
+# These functions do the actual calculations for the sine waves. They do not depend on the GUI, so that they can be used both by the MainWindow and by other #
+# programs (such as the StationManager, which runs several simulations at once without any windows).                                                         #
+#------------------------------------------------------------------------------------------------------------------------------------------------------------#
+
+def doppler_frequency(velocity, trans_freq):
+    """ This function calculates the frequency of the sine wave for a vehicle moving at 'velocity' (in meters per second) when the radar gun transmits at
+'trans_freq' (in Hz), using the Doppler Equation:
+
+    frequency = (2 * transmit_frequency * velocity) / c
+    """
+    return (2 * trans_freq * velocity) / SPEED_OF_LIGHT
+
+
+def speed_to_mps(speed_units, is_metric = False):
+    """ This function converts the passed speed into meters per second. If 'is_metric' is True the speed is in kilometers per hour, otherwise it is in
+miles per hour. """
+    if is_metric: #If the units are metric, then the speed is in kilometers per hour
+        return speed_units * (1000.0 / 60**2) #Convert to meters per second (make 1000 a floating point number to avoid integer division)
+
+    else: #Otherwise, the units are in miles per hour
+        return speed_units * (1609.34 / 60**2) #Convert to meters per second
+
+
+def check_trans_freq(trans_freq):
+    """ This function checks that the passed transmit frequency (in Hz) can be used: it must be a positive number (not infinity or 'not a number', which would
+turn every sample of a sine wave into 'not a number'). If it cannot be used, 'TRANSMIT FREQ ERROR' is returned; otherwise None is returned. """
+    try:
+        trans_freq = float(trans_freq)
+    except (TypeError, ValueError): #Not given (None), or not a number
+        return 'TRANSMIT FREQ ERROR'
+
+    if not (numpy.isfinite(trans_freq) and trans_freq > 0):
+        return 'TRANSMIT FREQ ERROR'
+
+    return None
+
+
+def create_sine_data(speed_units, direction, duration, amplitude, trans_freq, is_metric = False, frequency_sample = MainWindow.FREQUENCY_SAMPLE):
+    """ This function creates a sine wave using basic data passed into it - the speed of the vehicle, the direction of the vehicle (either True for approaching the
+radar gun or False for receding), how long the sine wave should last for, the amplitude of the sine waves (which correlates to the distance the vehicle is from
+the radar gun), the transmit frequency of the radar gun (in Hz) and whether the speed is in metric units.
+
+The returned numpy array holds one column for each channel (I and Q). If the data cannot be used, an error string is returned instead (the same strings that
+'create_error_window()' knows how to display). """
+
+    #First determine the phase angle using the direction
+    if direction:                       #If the direction is towards the radar
+        phase_angle = numpy.pi/2
+    elif direction == False:            #If the direction is away from the radar
+        phase_angle = -1 * numpy.pi/2
+    else:                               #Otherwise, the user did not choose a direction, so return 'ERROR' since the sine wave cannot be created
+        return 'DIR ERROR'
+
+    #Convert the passed string data into floating point numbers, if possible
+    try:
+        speed_units = float(speed_units)
+        duration = float(duration)
+        amplitude = float(amplitude)
+        
+    except (TypeError, ValueError): #Not a number or a string (such as None or a list), or a string that is not a number
+        return 'CONVERT ERROR' #Return an error message that the speed and/or the duration could not be converted
+
+    #If no transmit frequency was given (or it is not a positive number), then the frequency cannot be calculated, so exit the function with an error string
+    if check_trans_freq(trans_freq) != None:
+        return 'TRANSMIT FREQ ERROR' #No transmit frequency was specified, or it cannot be used
+
+    trans_freq = float(trans_freq)
+
+    #Turn the speed value in the specified units (either mph or kph) into meters per second and then calculate the frequency using the Doppler Equation
+    frequency = doppler_frequency(speed_to_mps(speed_units, is_metric), trans_freq)
+
+    #Create a numpy array that contains the numbers from 1 to the frequency sample multiplied by the duration. This is used to both create the sine wave and to
+    #determine its length of time to play
+    n_list = numpy.arange(1, int(round(duration * frequency_sample) + 1))
+
+    #Now, calculate the arrays/lists of cosine function values for creating the sound wave
+    ch_1_data = numpy.cos(2 * numpy.pi * frequency * n_list / frequency_sample)                         #The data for the first (left) channel of the sound
+    ch_2_data = 1.9 * numpy.cos((2 * numpy.pi * frequency * n_list / frequency_sample) - phase_angle)   #The data for the second (right) channel of the sound
+    
+    #Combine the two numpy arrays into one - needed for sending into sounddevice : will play multiple channels, but have to be in one multi-dimensional array
+    channels = numpy.array([ch_1_data, ch_2_data])
+
+    #Getting the transpose because sounddevice interprets COLUMNS as channels, NOT ROWS - using numpy.array([ch_1_data, ch_2_data]) returns
+    #the channel 1 and 2 arrays as ROWS of the new array. Thusly, to fit the specifications of sounddevice, the transpose must be used.
+    channels = channels.T
+
+    #Finally, multiply both channels by the passed amplitude and return them
+    return channels * amplitude
+
+
+#-------------------------------------------------------------------------------------------------------------------------------------------------------------#
+# These functions do the same calculations for a whole sweep of tones at once. Instead of calculating one frequency at a time (as 'calc_frequency()' does for #
+# the current state of the GUI), the frequencies for every carrier and speed are calculated in one numpy operation, and the sine waves for them are created   #
+# in blocks that can be passed straight into 'VerificationEngine.verify()'.                                                                                   #
+#-------------------------------------------------------------------------------------------------------------------------------------------------------------#
+
+def doppler_grid(trans_freqs, speeds, is_metric = False):
+    """ This function calculates the Doppler frequency (in Hz) for every transmit frequency in 'trans_freqs' (in Hz) and every speed in 'speeds' (in miles per
+hour, or kilometers per hour if 'is_metric' is True). A numpy array is returned with one row for each transmit frequency and one column for each speed. """
+    trans_freqs = numpy.asarray(trans_freqs, dtype = float)
+    velocities = speed_to_mps(numpy.asarray(speeds, dtype = float), is_metric)
+
+    #Use broadcasting to calculate the whole grid at once: the transmit frequencies go down the rows and the velocities across the columns
+    return doppler_frequency(velocities[numpy.newaxis, :], trans_freqs[:, numpy.newaxis])
+
+
+def create_sweep_data(frequencies, direction, duration, amplitude = 1, frequency_sample = MainWindow.FREQUENCY_SAMPLE):
+    """ This function creates the sine waves for all the frequencies (in Hz) in 'frequencies' at once. It returns a numpy array with the shape (tones, samples, 2)
+where each tone is exactly what 'create_sine_data()' would create for that frequency. The same error strings as 'create_sine_data()' are returned if the
+direction, duration, or amplitude cannot be used. """
+
+    #First determine the phase angle using the direction
+    if direction:                       #If the direction is towards the radar
+        phase_angle = numpy.pi/2
+    elif direction == False:            #If the direction is away from the radar
+        phase_angle = -1 * numpy.pi/2
+    else:                               #Otherwise, no direction was chosen
+        return 'DIR ERROR'
+
+    try:
+        duration = float(duration)
+        amplitude = float(amplitude)
+    except (TypeError, ValueError):
+        return 'CONVERT ERROR'
+
+    frequencies = numpy.asarray(frequencies, dtype = float).ravel() #A grid from 'doppler_grid()' is flattened, one row after another
+
+    n_list = numpy.arange(1, int(round(duration * frequency_sample) + 1))
+
+    #Calculate the angles for every tone (rows) and sample (columns) at once, in the same order as 'create_sine_data()' so that the results are identical
+    angles = 2 * numpy.pi * frequencies[:, numpy.newaxis] * n_list / frequency_sample
+
+    channels = numpy.empty((len(frequencies), len(n_list), 2))
+    channels[:, :, 0] = numpy.cos(angles)                       #The data for the first (left) channel of each tone
+    channels[:, :, 1] = 1.9 * numpy.cos(angles - phase_angle)   #The data for the second (right) channel of each tone
+
+    return channels * amplitude
+
+
+def iter_sweep(frequencies, direction, duration, amplitude = 1, frequency_sample = MainWindow.FREQUENCY_SAMPLE, batch_size = 64):
+    """ This function creates the sine waves for a long sweep a block at a time (so that the whole sweep does not have to fit in memory at once). For each block
+of up to 'batch_size' tones, it yields the index of the block's first frequency (in the flattened 'frequencies') and the block from 'create_sweep_data()'. If
+the sine waves cannot be created, the error string is yielded in place of the block. """
+    frequencies = numpy.asarray(frequencies, dtype = float).ravel()
+
+    for start in range(0, len(frequencies), batch_size):
+        yield start, create_sweep_data(frequencies[start:start + batch_size], direction, duration, amplitude, frequency_sample)
+
+
+#--------------------------------------------------------------------------------------------------------------------#
+# This function is used to create a dialog window to display messages about errors that occur during the simulation. #
+#--------------------------------------------------------------------------------------------------------------------#
+
+def create_error_window(gui, error_string):
+    """ This method creates a dialog window to display an error message to the user when an error occurs when running the simulation. """
+
+    #Create the buttons and the results for the buttons for the dialog window
+    buttons = [Button("#Close")]
+    signals = [DLGRESULT_OK]
+
+    #Create the dialog window
+    dialog_win = GenericDialog("Error Message", buttons, signals)
+
+    error = error_string + ": " #The type of error that was created
+
+    #Set up the widgets needed for the message
+    e_label = Label(error)      #Create a Label widget to display the kind of error that occured
+    frame = VFrame()            #Create a VFrame to hold the Label widget
+
+    frame.add_child(e_label) #Add the error string label to the frame
+    
+    #Determine what error string was passed into the function and get the appropriate error message to display
+    if error_string == "DIR ERROR": #An error happened with the direction of the vehicle - no direction specified
+
+        #Create a Label object to display the error message
+        msg_label = Label("Direction for vehicle not specified")
+
+        #Add the error message to the frame
+        frame.add_child(msg_label)
+
+    elif error_string == "CONVERT ERROR": #An error happened with the conversion of the speed, duration, and/or amplitude - no data or invalid data specified
+
+        #Create Label objects to display the error message
+        msg_label = Label("Invalid data for speed, duration,")
+        msg_label2 = Label("and/or amplitude")
+
+        #Add the error message to the frame
+        frame.add_child(msg_label)
+        frame.add_child(msg_label2)
+
+    elif error_string == "TRANSMIT FREQ ERROR": #An error happened with the transmit frequency for the vehicle - none was specified
+
+        #Create a Label object to display the error message
+        msg_label = Label("No transmit frequency was specified")
+
+        #Add the error message to the frame
+        frame.add_child(msg_label)
+
+    elif error_string == "DATA ERROR": #No data was specified at all (for advanced window)
+
+        #Create Label objects to display the error message
+        msg_label = Label("Invalid and/or no data was specifed")
+        msg_label2 = Label("for the vehicles")
+
+        #Add the error message to the frame
+        frame.add_child(msg_label)
+        frame.add_child(msg_label2)
+
+    else: #This shouldn't be come to, since any error will be one of the above, but for the impossible case, just say an error occured
+
+        #Create a Label object to display the error message
+        msg_label = Label("An error occured")
+
+        #Add the error message to the frame
+        frame.add_child(msg_label)
+        
+
+    dialog_win.content.add_child(frame) # Add the frame to the dialog window's content
+    
+    dialog_win.connect_signal(SIG_DIALOGRESPONSE, close_dialog, dialog_win)
+    dialog_win.depth = 2 #Put the dialog window on top of the other widgets
+
+    gui.add_widget(dialog_win) #Add the dialog window to the GUI
+
+
+#-----------------------------------------------------------------------------------------------------------------#
+# This function simply destroys the passed GenericDialog window (or technically any dialog window passed into it) #
+#-----------------------------------------------------------------------------------------------------------------#
+
+def close_dialog(result, dialog):
+    """ This method destroys the passed dialog window when called. """
+    if result == DLGRESULT_OK: #If the OK result was signaled (which should be the only signal), destroy the dialog window
+        dialog.destroy() #Destroy the dialog window
+
+
+#----------End of Function Definitions----------#
+
+
+
+
+#If run by itself without being imported, simply create the GUI window and start it. If the '--server' option is given, run the control server instead (without
+#the GUI) until the program is interrupted.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "NIST DTR Radar Target Simulator")
+    parser.add_argument("--server", action = "store_true", help = "run the control server instead of the GUI")
+    parser.add_argument("--host", default = "127.0.0.1", help = "the address the control server listens on")
+    parser.add_argument("--port", type = int, default = 0, help = "the TCP port the control server listens on (0 picks a free port)")
+    parser.add_argument("--unix", default = None, help = "listen on this Unix socket instead of a TCP port")
+    parser.add_argument("--channels", type = int, default = 2, help = "the number of output channels for the stations")
+    parser.add_argument("--device", default = None, help = "the sound card to play the stations on")
+    parser.add_argument("--null", action = "store_true", help = "play the stations into nothing (for testing without the hardware)")
+    parser.add_argument("--bands", default = None, help = "a config file with more transmit frequency bands to choose from")
+    parser.add_argument("--store", default = None, help = "a directory to keep the created sine waves (and test records) in")
+    parser.add_argument("--store-size", type = int, default = RenderStore.MAX_BYTES // 2**20, help = "the size limit of the store (in MB)")
+    args = parser.parse_args()
+
+    #Without OcempGUI only the control server can be run, and without sounddevice it can only play into nothing
+    if not args.server and not HAS_GUI:
+        parser.error("the GUI needs OcempGUI, which is not installed (use --server to run the control server)")
+
+    if args.server and not args.null and sounddevice == None:
+        parser.error("playing on a sound card needs sounddevice, which is not installed (use --null to play into nothing)")
+
+    #Load any extra bands before the GUI is created, so that they get radio buttons of their own
+    if args.bands != None and MainWindow.BANDS.load(args.bands) != None:
+        parser.error("could not load the bands from %s" % args.bands)
+
+    if args.server:
+        if args.store != None:
+            store = RenderStore(args.store, args.store_size * 2**20)
+        else:
+            store = None
+
+        if args.null:
+            manager = StationManager(args.channels, device = args.device, stream_class = NullOutputStream, store = store)
+        else:
+            manager = StationManager(args.channels, device = args.device, store = store)
+
+        server = ControlServer(manager, args.host, args.port, args.unix)
+
+        manager.start()
+        server.start()
+        print("Control server listening on %s" % (server.address,))
+
+        try:
+            #Wait until the program is interrupted. A short timeout is used so that Ctrl-C is noticed on Windows (waiting without one never wakes up for it)
+            waiting = threading.Event()
+            while True:
+                waiting.wait(1)
+        except KeyboardInterrupt:
+            pass
+
+        server.stop()
+        manager.stop()
+
+    else:
+        main = MainWindow()
+        main.start("NIST DTR Radar Target Simulator", 290, 325)
         
@@ -0,0 +1,332 @@
+# test_dtrradarsim.py - Tests for the NIST DTR Radar Target Simulator
+#
+# These tests drive the StationManager and the control server without any sound card (using the NullOutputStream) and without the GUI, so they only need
+# numpy (sounddevice and OcempGUI do not have to be installed). They are skipped if numpy is not installed.
+
+import json, socket
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import dtrradarsim
+
+
+#-----------------------------------------------------------------------------------------------------------------#
+# These fixtures set up a StationManager playing into the NullOutputStream, and a control server (and a loopback  #
+# client connected to it) for that manager.                                                                       #
+#-----------------------------------------------------------------------------------------------------------------#
+
+@pytest.fixture
+def manager():
+    manager = dtrradarsim.StationManager(4, stream_class = dtrradarsim.NullOutputStream)
+    manager.start()
+    yield manager
+    manager.stop()
+
+
+@pytest.fixture
+def client(manager):
+    server = dtrradarsim.ControlServer(manager)
+    server.start()
+
+    connection = socket.create_connection(server.address, timeout = 10)
+    stream = connection.makefile('rwb')
+
+    def send(message):
+        """ Sends a command (a dictionary, or a line of text) and returns the answer. """
+        if type(message) == dict:
+            message = json.dumps(message)
+
+        stream.write((message + '\n').encode('utf-8'))
+        stream.flush()
+        return json.loads(stream.readline().decode('utf-8'))
+
+    yield send
+
+    stream.close()
+    connection.close()
+    server.stop()
+
+
+START = {'command': 'start', 'station': 'A', 'mapping': [1, 2], 'speed': 50, 'direction': True, 'duration': 1, 'band': 'K'}
+
+
+#-----------------------------------------------#
+# Tests for the stations (without the server)   #
+#-----------------------------------------------#
+
+@pytest.mark.parametrize("mapping", [[2.5, 3.5], ["3", "4"], [True, 2], [1, None], [1, 1], [1, 2, 3], [0, 1], [4, 5], 5])
+def test_add_station_rejects_bad_mappings(mapping):
+    manager = dtrradarsim.StationManager(4)
+    assert manager.add_station('A', mapping) == 'CHANNEL ERROR'
+
+
+def test_add_station_rejects_used_channels():
+    manager = dtrradarsim.StationManager(4)
+    manager.add_station('A', (1, 2))
+
+    assert manager.add_station('B', (2, 3)) == 'CHANNEL ERROR'
+    assert manager.add_station('A', (3, 4)) == 'STATION ERROR'
+
+
+def test_stations_play_on_their_own_channels():
+    manager = dtrradarsim.StationManager(4)
+    station = manager.add_station('A', (3, 4))
+
+    assert station.load([[50, True, 1]], 0.1, 24.150e9) == None
+    assert station.play() == None
+
+    outdata = manager.render(512)
+    assert not outdata[:, :2].any()
+    assert abs(outdata[:, 2:]).max() <= 1
+
+
+def test_latency_is_measured_after_the_command():
+    manager = dtrradarsim.StationManager(2)
+    station = manager.add_station('A', (1, 2))
+    station.load([[50, True, 1]], 0.1, 24.150e9, received = 0.0)
+
+    manager.render(512) #The station is stopped, so loading it is not heard yet
+    assert station.get_status()['latency'] == None
+
+    received = dtrradarsim.timeit.default_timer()
+    station.play(received = received)
+    assert station.get_status()['latency'] == None
+
+    manager.render(512)
+    assert 0 <= station.get_status()['latency'] <= dtrradarsim.timeit.default_timer() - received
+
+
+@pytest.mark.parametrize("duration", [0, -1])
+def test_load_with_no_samples(duration):
+    station = dtrradarsim.StationManager(2).add_station('A', (1, 2))
+    assert station.load([[50, True, 1]], duration, 24.150e9) == 'DATA ERROR'
+
+
+#--------------------------------------------------------------#
+# Tests for the control server, using a loopback client        #
+#--------------------------------------------------------------#
+
+def test_start_update_and_status(client):
+    answer = client(dict(START, id = 7))
+    assert answer['ok'] and answer['id'] == 7
+
+    assert client({'command': 'update', 'station': 'A', 'speed': 60})['ok']
+
+    status = client({'command': 'status', 'station': 'A'})['status']
+    assert status['state'] == 'PLAYING'
+    assert status['scenario']['vehicles'] == [[60, True, 1]]
+
+    assert client({'command': 'stop', 'station': 'A'})['ok']
+    assert client({'command': 'status'})['status']['running']
+
+
+def test_error_answers(client):
+    assert client('not json') == {'ok': False, 'error': 'JSON ERROR'}
+    assert client({'command': 'bogus'})['error'] == 'COMMAND ERROR'
+    assert client({'command': 'stop', 'station': 'missing'})['error'] == 'STATION ERROR'
+    assert client(dict(START, direction = None))['error'] == 'DIR ERROR'
+
+
+def test_fractional_mapping_is_rejected(client, manager):
+    assert client(dict(START, mapping = [3.5, 2.5]))['error'] == 'CHANNEL ERROR'
+
+    #The stream must still be mixing the other stations
+    assert client(START)['ok']
+    assert manager.stream._thread.is_alive()
+
+
+def test_start_needs_a_station_name(client, manager):
+    message = dict(START)
+    del message['station']
+
+    assert client(message)['error'] == 'STATION ERROR'
+    assert client(dict(START, station = 5))['error'] == 'STATION ERROR'
+    assert list(manager.stations) == []
+
+
+@pytest.mark.parametrize("trans_freq", ['inf', float('nan'), 0, -24.150e9])
+def test_start_rejects_bad_transmit_frequencies(client, manager, trans_freq):
+    message = dict(START, trans_freq = trans_freq)
+    del message['band']
+
+    assert client(message)['error'] == 'TRANSMIT FREQ ERROR'
+    assert list(manager.stations) == []
+
+
+def test_unhashable_station_keeps_the_connection(client):
+    assert client({'command': 'status', 'station': ['x']})['error'] == 'STATION ERROR'
+    assert client({'command': 'status'})['ok']
+
+
+def test_zero_duration(client):
+    assert client(dict(START, duration = 0))['error'] == 'DATA ERROR'
+
+
+@pytest.mark.parametrize("bad", [{'speed': 'fast'}, {'speed': None}, {'amplitude': [1]}, {'duration': [1]}])
+def test_failed_start_does_not_keep_the_station(client, manager, bad):
+    assert client(dict(START, **bad))['error'] == 'CONVERT ERROR'
+    assert list(manager.stations) == []
+    assert client(START)['ok'] #The same mapping can be used again once the data is fixed
+
+
+def test_station_is_removed_when_start_raises(client, manager, monkeypatch):
+    def fail(*args):
+        raise RuntimeError("failed")
+
+    monkeypatch.setattr(dtrradarsim.Station, 'play', fail)
+
+    assert client(START)['error'] == 'SERVER ERROR'
+    assert list(manager.stations) == []
+
+
+#-----------------------------------------#
+# Tests for the transmit frequency bands  #
+#-----------------------------------------#
+
+@pytest.mark.parametrize("trans_freq", ['inf', float('-inf'), float('nan'), 0, -1, 'abc', None])
+def test_add_band_rejects_bad_frequencies(trans_freq):
+    registry = dtrradarsim.BandRegistry()
+    assert registry.add_band('bad', trans_freq) == 'TRANSMIT FREQ ERROR'
+    assert registry.get_frequency('bad') == None
+
+
+def test_load_rejects_infinite_frequencies(tmp_path):
+    config = tmp_path / "bands.ini"
+    config.write_text(u"[bands]\nKa-33.8 = 33.8e9\nbad = inf\n")
+
+    registry = dtrradarsim.BandRegistry()
+    assert registry.load(str(config)) == 'CONFIG ERROR'
+    assert registry.get_frequency('Ka-33.8') == None
+
+
+def test_doppler_grid_with_an_array_of_names():
+    registry = dtrradarsim.BandRegistry()
+    grid = registry.doppler_grid([50], dtrradarsim.numpy.array(['K', 'X']))
+
+    assert grid.shape == (2, 1)
+    assert grid[1, 0] == dtrradarsim.doppler_frequency(dtrradarsim.speed_to_mps(50.0), 10.525e9)
+
+
+def test_doppler_grid_with_one_band_name():
+    registry = dtrradarsim.BandRegistry()
+    grid = registry.doppler_grid([50, 60], 'Ka')
+
+    assert grid.shape == (1, 2)
+    assert grid[0, 0] == dtrradarsim.doppler_frequency(dtrradarsim.speed_to_mps(50.0), 34.7e9)
+
+
+#-----------------------------------------------#
+# Tests for the verification of the sine waves  #
+#-----------------------------------------------#
+
+@pytest.mark.parametrize("duration", [0.25, 0.5, 1, 2])
+@pytest.mark.parametrize("is_metric", [False, True])
+def test_exact_low_tones_pass(duration, is_metric):
+    results = dtrradarsim.VerificationEngine().verify_vehicles([[0.5, True, 1], [1, False, 1], [2, True, 1], [5, False, 1]], duration, 10.525e9, is_metric)
+
+    for result in results:
+        assert result['passed'] or result['error'] == 'RESOLUTION ERROR', result
+
+
+def test_tone_too_short_to_measure():
+    result = dtrradarsim.VerificationEngine().verify_vehicles([[0.5, True, 1]], 0.05, 10.525e9, True)[0]
+    assert result['error'] == 'RESOLUTION ERROR'
+
+
+@pytest.mark.parametrize("direction", [True, False])
+def test_negative_speeds_pass(direction):
+    engine = dtrradarsim.VerificationEngine()
+
+    assert all(result['passed'] for result in engine.verify_vehicles([[-50, direction, 1], [-5, direction, 1]], 1, 24.150e9))
+    assert all(result['passed'] for result in engine.verify_sweep([24.150e9], [-50, -20], direction, 1))
+
+
+@pytest.mark.parametrize("trans_freqs, speeds", [([], [50]), ([24.150e9], []), ([], [])])
+def test_empty_sweep(trans_freqs, speeds):
+    assert dtrradarsim.VerificationEngine().verify_sweep(trans_freqs, speeds, True, 1) == 'DATA ERROR'
+
+
+def test_sweep_with_bad_data():
+    engine = dtrradarsim.VerificationEngine()
+
+    assert engine.verify_sweep([24.150e9], [50], True, None) == 'CONVERT ERROR'
+    assert engine.verify_sweep([24.150e9], ['fast'], True, 1) == 'CONVERT ERROR'
+    assert engine.verify_sweep([float('inf')], [50], True, 1) == 'TRANSMIT FREQ ERROR'
+
+
+def test_wrong_direction_fails():
+    engine = dtrradarsim.VerificationEngine()
+    channels = dtrradarsim.create_sine_data(50, True, 1, 1, 24.150e9)
+    frequency = dtrradarsim.doppler_frequency(dtrradarsim.speed_to_mps(50), 24.150e9)
+
+    assert engine.verify_tones([{'channels': channels, 'frequency': frequency, 'direction': True}])[0]['passed']
+    assert not engine.verify_tones([{'channels': channels, 'frequency': frequency, 'direction': False}])[0]['passed']
+
+
+#-------------------------------#
+# Tests for the render store    #
+#-------------------------------#
+
+def test_store_reuses_identical_sine_waves(tmp_path):
+    store = dtrradarsim.RenderStore(str(tmp_path))
+
+    key, channels = store.get_sine('50', True, 0.1, 1, 24.150e9)
+    same_key, stored = store.get_sine(50.0, True, 0.1, 1.0, 24.150e9)
+
+    assert key == same_key
+    assert (stored == dtrradarsim.create_sine_data(50, True, 0.1, 1, 24.150e9)).all()
+    assert store.get_stored_params(key)['speed'] == 50.0
+
+
+@pytest.mark.parametrize("trans_freq", ['inf', float('nan'), 0, -1, None])
+def test_store_does_not_keep_bad_transmit_frequencies(tmp_path, trans_freq):
+    store = dtrradarsim.RenderStore(str(tmp_path))
+
+    assert dtrradarsim.create_sine_data(50, True, 0.1, 1, trans_freq) == 'TRANSMIT FREQ ERROR'
+    assert store.get_sine(50, True, 0.1, 1, trans_freq) == 'TRANSMIT FREQ ERROR'
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_store_uses_the_created_sine_wave_if_it_cannot_be_reopened(tmp_path, monkeypatch):
+    store = dtrradarsim.RenderStore(str(tmp_path))
+    monkeypatch.setattr(store, '_open', lambda key: None) #As if another process removed the file as soon as it was saved
+
+    key, channels = store.get_sine(50, True, 0.1, 1, 24.150e9)
+
+    assert (channels == dtrradarsim.create_sine_data(50, True, 0.1, 1, 24.150e9)).all()
+    assert not channels.flags.writeable
+
+    station = dtrradarsim.StationManager(2, store = store).add_station('A', (1, 2))
+    assert station.load([[50, True, 1]], 0.1, 24.150e9) == None
+
+
+def test_store_size_counts_every_file(tmp_path):
+    store = dtrradarsim.RenderStore(str(tmp_path), max_bytes = 200000)
+    store.log_record({'note': 'x' * 100000})
+
+    for speed in range(10, 20):
+        store.get_sine(speed, True, 0.1, 1, 24.150e9)
+
+    total = sum(path.stat().st_size for path in tmp_path.iterdir())
+    newest = tmp_path / (store.get_key(19, True, 0.1, 1, 24.150e9) + '.npy')
+
+    assert newest.exists()
+    assert total <= 200000
+
+
+def test_records_are_logged_once_per_test(tmp_path):
+    store = dtrradarsim.RenderStore(str(tmp_path))
+    station = dtrradarsim.StationManager(2, store = store).add_station('A', (1, 2))
+
+    station.load([[50, True, 1]], 0.1, 24.150e9)
+    station.play()
+    station.pause()
+    station.play()  #Resuming is the same test
+    station.stop()
+    station.play()  #Playing again after stopping is a new test
+
+    records = store.get_records()
+    assert [record['event'] for record in records] == ['play', 'play']
+    assert records[0]['scenario']['artifacts'] == [store.get_key(50, True, 0.1, 1, 24.150e9)]